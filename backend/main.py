@@ -4,20 +4,31 @@ Routes uploads to appropriate processors based on data type
 """
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from typing import Optional, List
+import asyncio
+import errno
+import hashlib
+import importlib
 import os
+import shutil
+import tempfile
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from pathlib import Path
 
-from processors.media_processor import MediaProcessor
-from processors.json_analyzer import JSONAnalyzer
-from processors.document_processor import DocumentProcessor
-from storage.storage_engine import StorageDecisionEngine
-from storage.directory_manager import DirectoryManager
-from metadata.indexer import MetadataIndexer
 from monitoring.logger import setup_logger
 
-app = FastAPI(title="Unified Smart Storage System", version="1.0.0")
+# orjson serializes responses several times faster than stdlib json and
+# handles numpy arrays natively - the media responses embed embeddings
+app = FastAPI(
+    title="Unified Smart Storage System",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 # CORS middleware
 app.add_middleware(
@@ -28,103 +39,439 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
+# Initialize logging
 logger = setup_logger()
 
-# Initialize components with error handling
-try:
-    media_processor = MediaProcessor()
-    logger.info("MediaProcessor initialized")
-except Exception as e:
-    logger.error(f"Failed to initialize MediaProcessor: {e}")
-    media_processor = None
-
-try:
-    json_analyzer = JSONAnalyzer()
-    logger.info("JSONAnalyzer initialized")
-except Exception as e:
-    logger.error(f"Failed to initialize JSONAnalyzer: {e}")
-    json_analyzer = None
-
-try:
-    document_processor = DocumentProcessor()
-    logger.info("DocumentProcessor initialized")
-except Exception as e:
-    logger.error(f"Failed to initialize DocumentProcessor: {e}")
-    document_processor = None
-
-try:
-    storage_engine = StorageDecisionEngine()
-    logger.info("StorageDecisionEngine initialized")
-except Exception as e:
-    logger.error(f"Failed to initialize StorageDecisionEngine: {e}")
-    storage_engine = None
-
-try:
-    directory_manager = DirectoryManager()
-    logger.info("DirectoryManager initialized")
-except Exception as e:
-    logger.error(f"Failed to initialize DirectoryManager: {e}")
-    directory_manager = None
-
-try:
-    metadata_indexer = MetadataIndexer()
-    logger.info("MetadataIndexer initialized")
-except Exception as e:
-    logger.error(f"Failed to initialize MetadataIndexer: {e}")
-    metadata_indexer = None
+# Pipeline components are imported and constructed lazily on first use:
+# importing MediaProcessor pulls in torch and downloads model weights,
+# which a worker that only serves search/stats traffic never needs.
+_COMPONENT_SPECS = {
+    "media_processor": ("processors.media_processor", "MediaProcessor"),
+    "json_analyzer": ("processors.json_analyzer", "JSONAnalyzer"),
+    "document_processor": ("processors.document_processor", "DocumentProcessor"),
+    "storage_engine": ("storage.storage_engine", "StorageDecisionEngine"),
+    "directory_manager": ("storage.directory_manager", "DirectoryManager"),
+    "metadata_indexer": ("metadata.indexer", "MetadataIndexer"),
+}
+_components: dict = {}
+
+
+def _get_component(name: str):
+    """Lazily import and construct a pipeline component on first use.
+
+    Initialization failures are logged and cached as None, matching the
+    previous eager-init error handling.
+    """
+    if name not in _components:
+        module_name, class_name = _COMPONENT_SPECS[name]
+        try:
+            module = importlib.import_module(module_name)
+            _components[name] = getattr(module, class_name)()
+            logger.info(f"{class_name} initialized")
+        except Exception as e:
+            logger.error(f"Failed to initialize {class_name}: {e}")
+            _components[name] = None
+    return _components[name]
 
 # Ensure upload directory exists
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Chunk size for streaming uploads to disk (1 MB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# LRU cache of upload results keyed by content hash, so re-uploads of an
+# identical file skip the embedding/OCR/schema pipeline entirely
+DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", "4096"))
+_dedup_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def _dedup_get(content_hash: str) -> Optional[dict]:
+    result = _dedup_cache.get(content_hash)
+    if result is not None:
+        _dedup_cache.move_to_end(content_hash)
+    return result
+
+
+def _dedup_put(content_hash: str, result: dict) -> None:
+    _dedup_cache[content_hash] = result
+    _dedup_cache.move_to_end(content_hash)
+    while len(_dedup_cache) > DEDUP_CACHE_SIZE:
+        _dedup_cache.popitem(last=False)
+
 
-def detect_mime_type(file: UploadFile) -> str:
-    """Detect MIME type from file"""
+# Optional direct-to-storage uploads: when S3_UPLOAD_BUCKET is set,
+# clients can request a presigned PUT URL and push bytes straight to
+# object storage, keeping the gateway off the data path for large files
+S3_UPLOAD_BUCKET = os.getenv("S3_UPLOAD_BUCKET")
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", "3600"))
+_s3_client = None
+if S3_UPLOAD_BUCKET:
+    try:
+        import boto3
+        _s3_client = boto3.client("s3")
+        logger.info(f"Direct upload enabled for bucket {S3_UPLOAD_BUCKET}")
+    except Exception as e:
+        logger.warning(f"S3_UPLOAD_BUCKET set but boto3 unavailable: {e}")
+
+
+# Opt-in content sniffing for uploads with no usable extension.
+# libmagic reads are not free, so this is off unless MIME_SNIFF=1.
+MIME_SNIFF_ENABLED = os.getenv("MIME_SNIFF", "0") == "1"
+_magic = None
+if MIME_SNIFF_ENABLED:
+    try:
+        import magic
+        _magic = magic.Magic(mime=True)
+        logger.info("libmagic MIME sniffing enabled")
+    except Exception as e:
+        logger.warning(f"MIME_SNIFF=1 but python-magic unavailable: {e}")
+
+
+@lru_cache(maxsize=1024)
+def _sniff_mime(head: bytes) -> str:
+    """Sniff MIME type from leading file bytes via libmagic (memoized)"""
+    try:
+        return _magic.from_buffer(head) or "application/octet-stream"
+    except Exception as e:
+        logger.warning(f"MIME sniff failed: {e}")
+        return "application/octet-stream"
+
+# Max number of files processed concurrently in a batch upload
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Executor for CPU-heavy processor work (image decode/inference, PDF text
+# extraction). The processors offload via run_in_executor(None, ...), so
+# installing this as the loop's default executor sizes that pool to the
+# machine instead of asyncio's I/O-oriented default. Threads are used
+# rather than processes because the torch/PIL state held by the
+# processors is not picklable; numpy/torch release the GIL in their hot
+# loops so threads still scale across cores.
+CPU_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 4))),
+    thread_name_prefix="cpu-worker",
+)
+
+
+@app.on_event("startup")
+async def _install_cpu_pool():
+    asyncio.get_running_loop().set_default_executor(CPU_POOL)
+
+
+@app.on_event("startup")
+async def _warm_media_processor():
+    """Optionally pre-load the media model (MEDIA_WARMUP=1).
+
+    Construction and warmup run in worker threads, so the server starts
+    accepting traffic while weights and labels load in the background.
+    Off by default: search-only workers keep the lazy-import behavior.
+    """
+    if os.getenv("MEDIA_WARMUP") != "1":
+        return
+
+    async def _warm():
+        processor = await asyncio.to_thread(_get_component, "media_processor")
+        if processor is not None:
+            await processor.warmup()
+            logger.info("Media processor warmed up")
+
+    asyncio.get_running_loop().create_task(_warm())
+
+
+# Extension -> MIME type fallback mapping (built once at import time)
+MIME_MAP = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".mp4": "video/mp4",
+    ".mov": "video/quicktime",
+    ".avi": "video/x-msvideo",
+    ".mkv": "video/x-matroska",
+    ".webm": "video/webm",
+    ".json": "application/json",
+    ".pdf": "application/pdf",
+    ".doc": "application/msword",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".txt": "text/plain",
+}
+
+# MIME type (or top-level type) -> data classification, precomputed so
+# classification is a hash lookup rather than a series of string scans
+_TYPE_CLASS = {
+    "image": "media",
+    "video": "media",
+    "application/json": "json",
+    "application/pdf": "document",
+    "application/msword": "document",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "document",
+    "text/plain": "document",
+}
+
+
+@lru_cache(maxsize=256)
+def _ext_to_mime(ext: str) -> str:
+    """Map a file extension to a MIME type (memoized)"""
+    return MIME_MAP.get(ext, "application/octet-stream")
+
+
+@lru_cache(maxsize=256)
+def _classify(mime_type: str) -> str:
+    """Classify a MIME type as media, json, document, or other (memoized)"""
+    return (
+        _TYPE_CLASS.get(mime_type)
+        or _TYPE_CLASS.get(mime_type.split("/", 1)[0])
+        or ("json" if mime_type.endswith("+json") else "other")
+    )
+
+
+def detect_mime_type(file: UploadFile, head: bytes = b"") -> str:
+    """Detect MIME type from the upload, using already-read leading bytes
+    for content sniffing so the file is never re-read"""
     content_type = file.content_type
     if not content_type:
         # Fallback: check file extension
         filename = file.filename or ""
         ext = Path(filename).suffix.lower()
-        mime_map = {
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".png": "image/png",
-            ".gif": "image/gif",
-            ".mp4": "video/mp4",
-            ".mov": "video/quicktime",
-            ".avi": "video/x-msvideo",
-            ".mkv": "video/x-matroska",
-            ".webm": "video/webm",
-            ".json": "application/json",
-            ".pdf": "application/pdf",
-            ".doc": "application/msword",
-            ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            ".txt": "text/plain",
-        }
-        content_type = mime_map.get(ext, "application/octet-stream")
+        content_type = _ext_to_mime(ext)
+    if content_type == "application/octet-stream" and _magic is not None and head:
+        # Last resort: sniff the leading bytes so extension-less uploads of
+        # supported types don't get rejected with a 400
+        content_type = _sniff_mime(head[:2048])
     return content_type
 
 
-def is_media_type(mime_type: str) -> bool:
-    """Check if MIME type is media (image/video)"""
-    return mime_type.startswith("image/") or mime_type.startswith("video/")
+def _consume_upload_sync(src, dst: Path) -> tuple:
+    """Stream an upload to disk in a single pass, simultaneously hashing
+    the content, counting bytes, and capturing the leading 4KB for MIME
+    sniffing - one read of the payload instead of three.
 
+    Reads straight from the underlying SpooledTemporaryFile and runs in a
+    worker thread, so there is no per-chunk event-loop round-trip and no
+    full-payload bytes object.
 
-def is_json_type(mime_type: str) -> bool:
-    """Check if MIME type is JSON"""
-    return mime_type == "application/json" or mime_type.endswith("+json")
+    Returns (content_hash, size, head).
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    size = 0
+    head = b""
+    src.seek(0)
+    with open(dst, "wb") as f:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+            if not head:
+                head = chunk[:4096]
+            size += len(chunk)
+            f.write(chunk)
+    return hasher.hexdigest(), size, head
+
+
+async def _consume_upload(upload: UploadFile, dst: Path) -> tuple:
+    """Async wrapper around _consume_upload_sync"""
+    return await asyncio.to_thread(_consume_upload_sync, upload.file, dst)
+
+
+# --- Metadata index write batching -------------------------------------
+# Index writes from concurrent uploads are funneled through one queue and
+# drained by a background task in batches, so a burst of uploads issues
+# its index round-trips together instead of one at a time. Callers get a
+# future that resolves to the assigned index id.
+INDEX_BATCH_MAX = int(os.getenv("INDEX_BATCH_MAX", "64"))
+_index_queue: Optional[asyncio.Queue] = None
+_index_worker: Optional[asyncio.Task] = None
+
+
+def _index_method(kind: str):
+    metadata_indexer = _get_component("metadata_indexer")
+    return {
+        "media": metadata_indexer.index_media_batch,
+        "json": metadata_indexer.index_json_batch,
+        "document": metadata_indexer.index_document_batch,
+    }[kind]
+
+
+async def _indexer_loop():
+    while True:
+        batch = [await _index_queue.get()]
+        while len(batch) < INDEX_BATCH_MAX and not _index_queue.empty():
+            batch.append(_index_queue.get_nowait())
+
+        # Group by kind so each drained batch turns into at most one
+        # round-trip per index table
+        groups: dict = {}
+        for kind, md, fut in batch:
+            groups.setdefault(kind, []).append((md, fut))
+
+        async def _run_group(kind, items):
+            metadatas = [md for md, _ in items]
+            try:
+                ids = await _with_retry(
+                    lambda: _index_method(kind)(metadatas), what=f"{kind} index"
+                )
+            except Exception as e:
+                for _, fut in items:
+                    if not fut.cancelled():
+                        fut.set_exception(e)
+                return
+            for (_, fut), index_id in zip(items, ids):
+                if not fut.cancelled():
+                    fut.set_result(index_id)
+
+        await asyncio.gather(*(_run_group(k, v) for k, v in groups.items()))
+
+
+async def _enqueue_index(kind: str, metadata: dict) -> "asyncio.Future[int]":
+    """Queue an index write; returns a future resolving to the index id"""
+    global _index_queue, _index_worker
+    if _index_queue is None:
+        _index_queue = asyncio.Queue()
+    if _index_worker is None or _index_worker.done():
+        _index_worker = asyncio.create_task(_indexer_loop())
+    fut = asyncio.get_running_loop().create_future()
+    await _index_queue.put((kind, metadata, fut))
+    return fut
+
+
+@dataclass
+class MediaSummary:
+    """Content summary for a processed media file.
+
+    Fields are cached_property so each value is computed (and the nested
+    metadata dict traversed) at most once per upload.
+    """
+    meta: dict
+    mime_type: str
+
+    @cached_property
+    def file_type(self) -> str:
+        return "image" if self.mime_type.startswith("image/") else "video"
+
+    @cached_property
+    def format(self) -> str:
+        return self.meta.get("format") or self.mime_type.split("/")[-1]
+
+    @cached_property
+    def dimensions(self) -> Optional[str]:
+        if self.file_type != "image":
+            return None
+        return f"{self.meta.get('width', 'N/A')}x{self.meta.get('height', 'N/A')}"
+
+    @cached_property
+    def file_size_bytes(self) -> int:
+        return self.meta.get("file_size", 0) or 0
+
+    @cached_property
+    def file_size_mb(self) -> float:
+        return round(self.file_size_bytes / (1024 * 1024), 2) if self.file_size_bytes else 0
+
+    def to_dict(self) -> dict:
+        summary = {
+            "file_type": self.file_type,
+            "dimensions": self.dimensions,
+            "format": self.format,
+            "file_size_bytes": self.file_size_bytes,
+            "file_size_mb": self.file_size_mb,
+        }
+        if self.file_type == "video":
+            summary.update({
+                "num_frames": self.meta.get("num_frames", "N/A"),
+                "duration_estimate": "N/A",  # Could be calculated if needed
+            })
+        return summary
 
 
-def is_document_type(mime_type: str) -> bool:
-    """Check if MIME type is a document (PDF, DOC, DOCX, TXT)"""
-    document_types = [
-        "application/pdf",
-        "application/msword",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        "text/plain",
-    ]
-    return mime_type in document_types
+@dataclass
+class DocumentSummary:
+    """Content summary for a processed document file"""
+    meta: dict
+    mime_type: str
+    text: str
+
+    @cached_property
+    def document_type(self) -> str:
+        return self.mime_type.split("/")[-1].upper()
+
+    @cached_property
+    def word_count(self) -> int:
+        return self.meta.get("word_count", 0)
+
+    @cached_property
+    def char_count(self) -> int:
+        return self.meta.get("char_count", 0)
+
+    @cached_property
+    def page_count(self):
+        num_pages = self.meta.get("num_pages", self.meta.get("line_count", 0))
+        return num_pages if num_pages else "N/A"
+
+    @cached_property
+    def file_size_bytes(self) -> int:
+        return self.meta.get("file_size", 0) or 0
+
+    @cached_property
+    def file_size_mb(self) -> float:
+        return round(self.file_size_bytes / (1024 * 1024), 2) if self.file_size_bytes else 0
+
+    def to_dict(self) -> dict:
+        return {
+            "document_type": self.document_type,
+            "word_count": self.word_count,
+            "character_count": self.char_count,
+            "page_count": self.page_count,
+            "file_size_bytes": self.file_size_bytes,
+            "file_size_mb": self.file_size_mb,
+            "has_text": len(self.text) > 0,
+            "text_length": len(self.text),
+        }
+
+
+def _fast_copy(src: Path, dst: Path) -> None:
+    """Move/copy a file without bouncing its bytes through user space.
+
+    Tries a same-filesystem rename first (zero bytes moved), then
+    os.sendfile (kernel-space copy), and only falls back to shutil.copy2
+    when neither is available.
+    """
+    try:
+        os.rename(src, dst)
+        return
+    except OSError:
+        pass
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            os.sendfile(d.fileno(), s.fileno(), 0, os.fstat(s.fileno()).st_size)
+    except (OSError, AttributeError):
+        shutil.copy2(src, dst)
+
+
+# Errors considered transient for storage/index writes. Validation-style
+# failures (ValueError, HTTPException) are not retried, and neither are
+# deterministic OS errors (FileNotFoundError, PermissionError, ...) -
+# only connection/timeout failures and errnos that can clear on their own.
+_TRANSIENT_ERRORS = (ConnectionError, TimeoutError)
+_TRANSIENT_ERRNOS = {errno.EAGAIN, errno.EBUSY, errno.EINTR, errno.ENOSPC}
+
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, _TRANSIENT_ERRORS):
+        return True
+    return isinstance(exc, OSError) and exc.errno in _TRANSIENT_ERRNOS
+
+
+async def _with_retry(coro_factory, attempts: int = 3, what: str = "storage operation"):
+    """Run an awaitable factory with exponential backoff on transient errors"""
+    for attempt in range(attempts):
+        try:
+            return await coro_factory()
+        except OSError as e:
+            if not _is_transient(e) or attempt == attempts - 1:
+                raise
+            delay = 2 ** attempt
+            logger.warning(
+                f"{what} failed (attempt {attempt + 1}/{attempts}): {e}; "
+                f"retrying in {delay}s"
+            )
+            await asyncio.sleep(delay)
 
 
 @app.get("/")
@@ -133,163 +480,181 @@ async def root():
     return {"status": "ok", "service": "Unified Smart Storage System"}
 
 
-@app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
-    """
-    Unified upload endpoint
-    Detects data type and routes to appropriate processor
+async def _upload_one(file: UploadFile) -> dict:
+    """Process a single upload and return the raw result dict.
+
+    Shared by the single and batch upload routes so batch responses are
+    serialized exactly once at the outer boundary.
     """
+    file_path = None
     try:
         logger.info(f"Received upload: {file.filename}, type: {file.content_type}")
-        
-        # Detect MIME type
-        mime_type = detect_mime_type(file)
+
+        # Materialize the upload to a unique temp file only because the
+        # processors need a real path; keep the original stem/suffix so
+        # filename-based categorization fallbacks still work. Streamed in
+        # 1 MB chunks so large uploads never get buffered fully in memory.
+        # Sanitize the client-supplied filename once: strip any directory
+        # components so joins below can't escape the storage directories
+        original = Path(Path(file.filename or "upload").name)
+        safe_name = original.name
+        tmp = tempfile.NamedTemporaryFile(
+            delete=False, dir=UPLOAD_DIR,
+            prefix=f"{original.stem}_", suffix=original.suffix,
+        )
+        tmp.close()
+        file_path = Path(tmp.name)
+        content_hash, upload_size, head = await _consume_upload(file, file_path)
+
+        # Detect MIME type (content sniffing reuses the head bytes captured
+        # during the streaming write)
+        mime_type = detect_mime_type(file, head)
         logger.info(f"Detected MIME type: {mime_type}")
+
+        # Identical content already processed? Return the cached result
+        cached = _dedup_get(content_hash)
+        if cached is not None:
+            logger.info(f"Duplicate upload {file.filename} ({content_hash}); returning cached result")
+            return cached
         
-        # Save uploaded file temporarily
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        
-        result = None
-        
-        # Route based on data type
-        if is_media_type(mime_type):
-            if media_processor is None:
-                raise HTTPException(
-                    status_code=503,
-                    detail="Media processor is not available"
-                )
-            logger.info("Routing to media processor")
-            result = await process_media(file_path, mime_type, file.filename)
-        
-        elif is_json_type(mime_type):
-            if json_analyzer is None or storage_engine is None:
-                raise HTTPException(
-                    status_code=503,
-                    detail="JSON processing components are not available"
-                )
-            logger.info("Routing to JSON analyzer")
-            result = await process_json(file_path, file.filename)
-        
-        elif is_document_type(mime_type):
-            if document_processor is None:
-                raise HTTPException(
-                    status_code=503,
-                    detail="Document processor is not available"
-                )
-            logger.info("Routing to document processor")
-            result = await process_document(file_path, mime_type, file.filename)
-        
-        else:
+        # Route based on data type: single dict lookup instead of an elif chain
+        route = _HANDLERS.get(_classify(mime_type))
+        if route is None:
             raise HTTPException(
                 status_code=400,
                 detail=f"Unsupported file type: {mime_type}"
             )
-        
-        # Clean up temp file
-        file_path.unlink()
-        
-        return JSONResponse(content=result)
-    
+
+        handler, is_ready, unavailable_detail = route
+        if not is_ready():
+            raise HTTPException(status_code=503, detail=unavailable_detail)
+
+        logger.info(f"Routing to {handler.__name__}")
+        result = await handler(file_path, mime_type, safe_name, content_hash)
+        _dedup_put(content_hash, result)
+
+        return result
+
     except Exception as e:
         logger.error(f"Upload error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Clean up temp file even when processing fails
+        if file_path is not None:
+            await asyncio.to_thread(
+                lambda: file_path.unlink(missing_ok=True)
+            )
 
 
-async def process_media(file_path: Path, mime_type: str, filename: str) -> dict:
+@app.post("/api/upload")
+async def upload_file(file: UploadFile = File(...)):
+    """
+    Unified upload endpoint
+    Detects data type and routes to appropriate processor
+    """
+    return ORJSONResponse(content=await _upload_one(file))
+
+
+async def process_media(
+    file_path: Path, mime_type: str, filename: str,
+    content_hash: Optional[str] = None,
+) -> dict:
     """Process media file through media processor"""
     # Generate embeddings and classify
+    media_processor = _get_component("media_processor")
     processing_result = await media_processor.process(file_path, mime_type)
-    
+
     # Get semantic category
     category = processing_result.get("category", "uncategorized")
-    
+
     # Directory manager: create or use existing category directory
+    directory_manager = _get_component("directory_manager")
     if directory_manager:
-        storage_path = await directory_manager.store_media(
-            file_path, category, filename
+        storage_path = await _with_retry(
+            lambda: directory_manager.store_media(file_path, category, filename),
+            what="storage write",
         )
     else:
-        # Fallback: use uploads directory
+        # Fallback: use uploads directory (copy in a thread so the event
+        # loop isn't blocked for the duration of a large file copy)
         storage_path = UPLOAD_DIR / filename
-        import shutil
-        shutil.copy2(file_path, storage_path)
-    
-    # Store metadata and index
+        await asyncio.to_thread(_fast_copy, file_path, storage_path)
+
+    # Store metadata and index (stringify the storage path once; it is
+    # reused in the index record, the log line and the response)
+    storage_path_str = str(storage_path)
     metadata = {
         "filename": filename,
+        "content_hash": content_hash,
         "mime_type": mime_type,
         "category": category,
-        "storage_path": str(storage_path),
+        "storage_path": storage_path_str,
         "embeddings": processing_result.get("embeddings"),
         "metadata": processing_result.get("metadata", {}),
     }
     
-    if metadata_indexer:
-        index_id = await metadata_indexer.index_media(metadata)
+    # Queue the index write so it batches with concurrent uploads and
+    # overlaps with summary construction below
+    if _get_component("metadata_indexer"):
+        index_task = await _enqueue_index("media", metadata)
     else:
-        index_id = 0
-    
-    logger.info(f"Media processed: {filename} -> {storage_path}, category: {category}")
-    
+        index_task = None
+
+    logger.info(f"Media processed: {filename} -> {storage_path_str}, category: {category}")
+
     # Prepare content summary
-    content_summary = {
-        "file_type": "image" if mime_type.startswith("image/") else "video",
-        "dimensions": f"{metadata.get('metadata', {}).get('width', 'N/A')}x{metadata.get('metadata', {}).get('height', 'N/A')}" if mime_type.startswith("image/") else None,
-        "format": metadata.get("metadata", {}).get("format", mime_type.split("/")[-1]),
-        "file_size_bytes": metadata.get("metadata", {}).get("file_size", 0),
-        "file_size_mb": round(metadata.get("metadata", {}).get("file_size", 0) / (1024 * 1024), 2) if metadata.get("metadata", {}).get("file_size") else 0,
-    }
-    
-    if mime_type.startswith("video/"):
-        content_summary.update({
-            "num_frames": metadata.get("metadata", {}).get("num_frames", "N/A"),
-            "duration_estimate": "N/A",  # Could be calculated if needed
-        })
-    
+    summary = MediaSummary(meta=processing_result.get("metadata", {}), mime_type=mime_type)
+
+    index_id = await index_task if index_task else 0
+
     return {
         "status": "success",
         "type": "media",
-        "file_type": content_summary["file_type"],
+        "file_type": summary.file_type,
         "category": category,
-        "location_saved": str(storage_path),
+        "location_saved": storage_path_str,
         "filename": filename,
         "index_id": index_id,
         "whats_inside": {
-            "summary": f"{content_summary['file_type'].title()} file ({content_summary['format']})",
-            "details": content_summary,
-            "description": f"Category: {category} | Format: {content_summary['format']} | Size: {content_summary['file_size_mb']} MB",
+            "summary": f"{summary.file_type.title()} file ({summary.format})",
+            "details": summary.to_dict(),
+            "description": f"Category: {category} | Format: {summary.format} | Size: {summary.file_size_mb} MB",
         },
         "metadata": metadata,
     }
 
 
-async def process_json(file_path: Path, filename: str) -> dict:
+async def process_json(
+    file_path: Path, mime_type: str, filename: str,
+    content_hash: Optional[str] = None,
+) -> dict:
     """Process JSON file through JSON analyzer"""
     try:
         # Analyze JSON structure
-        analysis = await json_analyzer.analyze(file_path)
+        analysis = await _get_component("json_analyzer").analyze(file_path)
         
         # Schema builder decides SQL vs NoSQL
+        storage_engine = _get_component("storage_engine")
         schema_decision = await storage_engine.decide_storage(analysis)
         
         # Store in appropriate database
-        storage_result = await storage_engine.store_json(
-            file_path, analysis, schema_decision
+        storage_result = await _with_retry(
+            lambda: storage_engine.store_json(file_path, analysis, schema_decision),
+            what="JSON store",
         )
         
         # Store metadata and index
         metadata = {
             "filename": filename,
+            "content_hash": content_hash,
             "analysis": analysis,
             "schema_decision": schema_decision,
             "storage_result": storage_result,
         }
         
-        if metadata_indexer:
-            index_id = await metadata_indexer.index_json(metadata)
+        if _get_component("metadata_indexer"):
+            index_fut = await _enqueue_index("json", metadata)
+            index_id = await index_fut
         else:
             index_id = 0
         
@@ -369,61 +734,60 @@ async def process_json(file_path: Path, filename: str) -> dict:
         raise HTTPException(status_code=500, detail=f"Error processing JSON: {str(e)}")
 
 
-async def process_document(file_path: Path, mime_type: str, filename: str) -> dict:
+async def process_document(
+    file_path: Path, mime_type: str, filename: str,
+    content_hash: Optional[str] = None,
+) -> dict:
     """Process document file (PDF, DOC, DOCX, TXT) through document processor"""
     # Process document to extract text and metadata
+    document_processor = _get_component("document_processor")
     processing_result = await document_processor.process(file_path, mime_type)
-    
+
     # Get semantic category
     category = processing_result.get("category", "uncategorized")
-    
+
     # Directory manager: create or use existing category directory
+    directory_manager = _get_component("directory_manager")
     if directory_manager:
-        storage_path = await directory_manager.store_media(
-            file_path, category, filename
+        storage_path = await _with_retry(
+            lambda: directory_manager.store_media(file_path, category, filename),
+            what="storage write",
         )
     else:
-        # Fallback: use uploads directory
+        # Fallback: use uploads directory (copy in a thread so the event
+        # loop isn't blocked for the duration of a large file copy)
         storage_path = UPLOAD_DIR / filename
-        import shutil
-        shutil.copy2(file_path, storage_path)
+        await asyncio.to_thread(_fast_copy, file_path, storage_path)
     
-    # Store metadata and index
+    # Store metadata and index (stringify the storage path once; it is
+    # reused in the index record, the log line and the response)
+    storage_path_str = str(storage_path)
     metadata = {
         "filename": filename,
+        "content_hash": content_hash,
         "mime_type": mime_type,
         "category": category,
-        "storage_path": str(storage_path),
+        "storage_path": storage_path_str,
         "text": processing_result.get("text", ""),
         "embeddings": processing_result.get("embeddings"),
         "metadata": processing_result.get("metadata", {}),
     }
     
-    if metadata_indexer:
-        index_id = await metadata_indexer.index_document(metadata)
+    # Queue the index write so it batches with concurrent uploads and
+    # overlaps with summary construction below
+    if _get_component("metadata_indexer"):
+        index_task = await _enqueue_index("document", metadata)
     else:
-        index_id = 0
-    
-    logger.info(f"Document processed: {filename} -> {storage_path}, category: {category}")
+        index_task = None
+
+    logger.info(f"Document processed: {filename} -> {storage_path_str}, category: {category}")
     
     # Prepare content summary
     doc_metadata = processing_result.get("metadata", {})
     text_content = processing_result.get("text", "")
-    word_count = doc_metadata.get("word_count", 0)
-    char_count = doc_metadata.get("char_count", 0)
-    num_pages = doc_metadata.get("num_pages", doc_metadata.get("line_count", 0))
-    
-    content_summary = {
-        "document_type": mime_type.split("/")[-1].upper(),
-        "word_count": word_count,
-        "character_count": char_count,
-        "page_count": num_pages if num_pages else "N/A",
-        "file_size_bytes": doc_metadata.get("file_size", 0),
-        "file_size_mb": round(doc_metadata.get("file_size", 0) / (1024 * 1024), 2) if doc_metadata.get("file_size") else 0,
-        "has_text": len(text_content) > 0,
-        "text_length": len(text_content),
-    }
-    
+    summary = DocumentSummary(meta=doc_metadata, mime_type=mime_type, text=text_content)
+
+
     # Extract first few sentences for preview
     text_preview = text_content[:500] if text_content else ""
     if len(text_content) > 500:
@@ -437,42 +801,148 @@ async def process_document(file_path: Path, mime_type: str, filename: str) -> di
         doc_properties["author"] = doc_metadata.get("author")
     if doc_metadata.get("subject"):
         doc_properties["subject"] = doc_metadata.get("subject")
-    
+
+    index_id = await index_task if index_task else 0
+
     return {
         "status": "success",
         "type": "document",
-        "file_type": content_summary["document_type"],
+        "file_type": summary.document_type,
         "category": category,
-        "location_saved": str(storage_path),
+        "location_saved": storage_path_str,
         "filename": filename,
         "index_id": index_id,
         "whats_inside": {
-            "summary": f"{content_summary['document_type']} document with {word_count} words",
-            "details": content_summary,
+            "summary": f"{summary.document_type} document with {summary.word_count} words",
+            "details": summary.to_dict(),
             "text_preview": text_preview,
             "properties": doc_properties,
-            "description": f"Category: {category} | Pages: {content_summary['page_count']} | Words: {word_count} | Size: {content_summary['file_size_mb']} MB",
+            "description": f"Category: {category} | Pages: {summary.page_count} | Words: {summary.word_count} | Size: {summary.file_size_mb} MB",
         },
         "metadata": metadata,
     }
 
 
+# Dispatch table: classification -> (handler, readiness check, 503 detail).
+# Readiness is checked through callables so component init failures at
+# startup are still reflected per-request.
+_HANDLERS = {
+    "media": (
+        process_media,
+        lambda: _get_component("media_processor") is not None,
+        "Media processor is not available",
+    ),
+    "json": (
+        process_json,
+        lambda: (_get_component("json_analyzer") is not None
+                 and _get_component("storage_engine") is not None),
+        "JSON processing components are not available",
+    ),
+    "document": (
+        process_document,
+        lambda: _get_component("document_processor") is not None,
+        "Document processor is not available",
+    ),
+}
+
+
+@app.post("/api/upload/session")
+async def create_upload_session(filename: str):
+    """Issue a presigned PUT URL so large uploads go straight to object
+    storage instead of through the gateway"""
+    if _s3_client is None:
+        raise HTTPException(
+            status_code=501,
+            detail="Direct upload is not configured; set S3_UPLOAD_BUCKET"
+        )
+    safe_name = Path(filename or "upload").name
+    file_id = uuid.uuid4().hex
+    object_key = f"incoming/{file_id}/{safe_name}"
+    presigned_put_url = await asyncio.to_thread(
+        _s3_client.generate_presigned_url,
+        "put_object",
+        Params={"Bucket": S3_UPLOAD_BUCKET, "Key": object_key},
+        ExpiresIn=UPLOAD_SESSION_TTL,
+    )
+    logger.info(f"Created upload session {file_id} for {safe_name}")
+    return {
+        "file_id": file_id,
+        "object_key": object_key,
+        "presigned_put_url": presigned_put_url,
+        "expires_in": UPLOAD_SESSION_TTL,
+    }
+
+
+@app.post("/api/webhook/ingest")
+async def ingest_webhook(payload: dict):
+    """Process an object that was PUT directly to storage via a presigned
+    URL (called by the bucket notification or by the client after upload)"""
+    if _s3_client is None:
+        raise HTTPException(
+            status_code=501,
+            detail="Direct upload is not configured; set S3_UPLOAD_BUCKET"
+        )
+    object_key = payload.get("object_key")
+    if not object_key:
+        raise HTTPException(status_code=400, detail="object_key is required")
+
+    filename = Path(object_key).name
+    mime_type = _ext_to_mime(Path(filename).suffix.lower())
+    route = _HANDLERS.get(_classify(mime_type))
+    if route is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {mime_type}"
+        )
+    handler, is_ready, unavailable_detail = route
+    if not is_ready():
+        raise HTTPException(status_code=503, detail=unavailable_detail)
+
+    # Pull the object down once for processing; the canonical copy stays
+    # in object storage
+    tmp = tempfile.NamedTemporaryFile(
+        delete=False, dir=UPLOAD_DIR, suffix=Path(filename).suffix
+    )
+    tmp.close()
+    file_path = Path(tmp.name)
+    try:
+        await asyncio.to_thread(
+            _s3_client.download_file, S3_UPLOAD_BUCKET, object_key, str(file_path)
+        )
+        logger.info(f"Ingesting {object_key} via webhook")
+        result = await handler(file_path, mime_type, filename)
+        return ORJSONResponse(content=result)
+    finally:
+        await asyncio.to_thread(lambda: file_path.unlink(missing_ok=True))
+
+
 @app.post("/api/upload/batch")
 async def upload_batch(files: List[UploadFile] = File(...)):
-    """Batch upload endpoint"""
+    """Batch upload endpoint - processes files concurrently"""
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def process_one(file: UploadFile):
+        async with semaphore:
+            return await _upload_one(file)
+
+    outcomes = await asyncio.gather(
+        *(process_one(file) for file in files), return_exceptions=True
+    )
+
     results = []
-    for file in files:
-        try:
-            result = await upload_file(file)
-            results.append(result)
-        except Exception as e:
-            logger.error(f"Error processing {file.filename}: {str(e)}")
+    for file, outcome in zip(files, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Error processing {file.filename}: {str(outcome)}")
             results.append({
                 "status": "error",
                 "filename": file.filename,
-                "error": str(e),
+                "error": str(outcome),
             })
-    return {"results": results}
+        else:
+            results.append(outcome)
+    # Return the Response directly: a plain dict would go through
+    # jsonable_encoder, which has no ndarray handler for the embeddings
+    return ORJSONResponse(content={"results": results})
 
 
 @app.get("/api/search/media")
@@ -482,6 +952,7 @@ async def search_media(
     limit: int = 20
 ):
     """Search media by category or semantic query"""
+    metadata_indexer = _get_component("metadata_indexer")
     if metadata_indexer is None:
         raise HTTPException(status_code=503, detail="Metadata indexer is not available")
     results = await metadata_indexer.search_media(
@@ -497,6 +968,7 @@ async def search_json(
     limit: int = 20
 ):
     """Search JSON records"""
+    metadata_indexer = _get_component("metadata_indexer")
     if metadata_indexer is None:
         raise HTTPException(status_code=503, detail="Metadata indexer is not available")
     results = await metadata_indexer.search_json(
@@ -513,6 +985,7 @@ async def search_documents(
     limit: int = 20
 ):
     """Search documents by category, mime type, or text query"""
+    metadata_indexer = _get_component("metadata_indexer")
     if metadata_indexer is None:
         raise HTTPException(status_code=503, detail="Metadata indexer is not available")
     results = await metadata_indexer.search_documents(
@@ -524,6 +997,7 @@ async def search_documents(
 @app.get("/api/stats")
 async def get_stats():
     """Get system statistics"""
+    metadata_indexer = _get_component("metadata_indexer")
     if metadata_indexer is None:
         return {"error": "Metadata indexer is not available"}
     stats = await metadata_indexer.get_stats()
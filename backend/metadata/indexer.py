@@ -6,7 +6,9 @@ Enables efficient retrieval
 # smart file tracker
 # It doesn’t store the actual files
 # it stores metadata about them so you can search, filter, and manage them efficiently.
+import asyncio
 import os
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any
 import logging
 from datetime import datetime
@@ -15,6 +17,25 @@ import json
 from storage.database.sql_storage import SQLStorage
 from storage.database.nosql_storage import NoSQLStorage
 
+try:
+    import orjson
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj)
+
+def _embedding_list(embeddings) -> Optional[List[float]]:
+    """Normalize embeddings to a plain list at the storage boundary;
+    processors may hand over numpy arrays to avoid per-image boxing"""
+    if embeddings is None:
+        return None
+    if hasattr(embeddings, "tolist"):
+        embeddings = embeddings.tolist()
+    return embeddings if len(embeddings) else None
+
+
 logger = logging.getLogger(__name__)
 
 class MetadataIndexer:
@@ -28,6 +49,11 @@ class MetadataIndexer:
         self._media_schema = None
         self._json_schema = None
         self._document_schema = None
+        # LRU of recently indexed (table, filename, storage location) keys
+        # so re-submitting the same file within a run reuses its index id
+        # instead of paying another insert round-trip
+        self._recent_ids: "OrderedDict[tuple, int]" = OrderedDict()
+        self._recent_max = int(os.getenv("INDEX_DEDUP_CACHE_SIZE", "2048"))
         self._ensure_metadata_tables()
     
     def _ensure_metadata_tables(self):
@@ -41,16 +67,25 @@ class MetadataIndexer:
                 {"name": "mime_type", "type": "VARCHAR(100)", "nullable": False},
                 {"name": "category", "type": "VARCHAR(100)", "nullable": False},
                 {"name": "storage_path", "type": "TEXT", "nullable": False},
-                {"name": "embeddings", "type": "JSONB", "nullable": True},
+                # Native float array, not a JSONB string: ~4x smaller on
+                # disk and no server-side JSON parse when similarity search
+                # lands on this column
+                {"name": "embeddings", "type": "real[]", "nullable": True},
                 {"name": "metadata", "type": "JSONB", "nullable": True},
                 {"name": "created_at", "type": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP", "nullable": False},
             ],
             "indexes": [
+                # Single-column entries only: that is the shape
+                # SQLStorage.create_table understands. Composite covering
+                # indexes (category, created_at DESC) INCLUDE (...) would
+                # make listings index-only scans, but need storage-layer
+                # support first
                 {"field": "category", "type": "BTREE"},
+                {"field": "created_at", "type": "BTREE"},
                 {"field": "filename", "type": "BTREE"},
             ],
         }
-        
+
         # JSON metadata table
         json_schema = {
             "table_name": "json_index",
@@ -65,6 +100,7 @@ class MetadataIndexer:
             ],
             "indexes": [
                 {"field": "schema_name", "type": "BTREE"},
+                {"field": "created_at", "type": "BTREE"},
                 {"field": "storage_type", "type": "BTREE"},
             ],
         }
@@ -90,85 +126,53 @@ class MetadataIndexer:
             ],
         }
         
-        # Create tables (async, but called during init)
-        # Use try-except to handle cases where event loop is already running
-        import asyncio
-        try:
-            # Try to get existing event loop
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    # If loop is running, schedule for later
-                    logger.warning("Event loop is running, tables will be created on first use")
-                    self._tables_created = False
-                    self._media_schema = media_schema
-                    self._json_schema = json_schema
-                    self._document_schema = document_schema
-                    return
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            # Create tables
-            try:
-                loop.run_until_complete(self.sql_storage.create_table(media_schema))
-                loop.run_until_complete(self.sql_storage.create_table(json_schema))
-                loop.run_until_complete(self.sql_storage.create_table(document_schema))
-                self._tables_created = True
-            except Exception as e:
-                logger.warning(f"Could not create tables during init: {e}. Will retry on first use.")
-                self._tables_created = False
-                self._media_schema = media_schema
-                self._json_schema = json_schema
-                self._document_schema = document_schema
-        except Exception as e:
-            logger.error(f"Error in table initialization: {e}")
-            self._tables_created = False
-            self._media_schema = media_schema
-            self._json_schema = json_schema
-            self._document_schema = document_schema
-    
+        # Just record the schemas; table creation is async and happens on
+        # first use (or eagerly via MetadataIndexer.create()). Driving the
+        # loop from __init__ with run_until_complete raised RuntimeError
+        # whenever the indexer was built inside an async handler
+        self._media_schema = media_schema
+        self._json_schema = json_schema
+        self._document_schema = document_schema
+
+    @classmethod
+    async def create(cls) -> "MetadataIndexer":
+        """Construct an indexer and create its tables up front"""
+        indexer = cls()
+        await indexer._ensure_tables_async()
+        return indexer
+
     async def _ensure_tables_async(self):
         """Ensure tables are created (async version)"""
         if not self._tables_created and self._media_schema and self._json_schema and self._document_schema:
             try:
-                await self.sql_storage.create_table(self._media_schema)
-                await self.sql_storage.create_table(self._json_schema)
-                await self.sql_storage.create_table(self._document_schema)
+                # The three tables are independent; create them in parallel
+                await asyncio.gather(
+                    self.sql_storage.create_table(self._media_schema),
+                    self.sql_storage.create_table(self._json_schema),
+                    self.sql_storage.create_table(self._document_schema),
+                )
                 self._tables_created = True
             except Exception as e:
                 logger.warning(f"Could not create tables: {e}")
     
-    #Add a file
-    async def index_media(self, metadata: Dict) -> int:
-        """Index media file metadata"""
-        await self._ensure_tables_async()
-        
-        record = {
+    def _media_record(self, metadata: Dict) -> Dict:
+        """Build a media_index row from processor metadata"""
+        return {
             "filename": metadata.get("filename"),
             "mime_type": metadata.get("mime_type"),
             "category": metadata.get("category", "uncategorized"),
             "storage_path": str(metadata.get("storage_path", "")),
-            "embeddings": json.dumps(metadata.get("embeddings")) if metadata.get("embeddings") else None,
-            "metadata": json.dumps(metadata.get("metadata", {})),
+            "embeddings": _embedding_list(metadata.get("embeddings")),
+            "metadata": _json_dumps(metadata.get("metadata", {})),
         }
-        
-        result = await self.sql_storage.insert("media_index", record)
-        index_id = result.get("id")
-        
-        logger.info(f"Indexed media: {metadata.get('filename')} -> index_id: {index_id}")
-        return index_id or 0
-    
-    #Add a jsonfile
-    async def index_json(self, metadata: Dict) -> int:
-        """Index JSON file metadata"""
-        await self._ensure_tables_async()
-        
+
+    def _json_record(self, metadata: Dict) -> Dict:
+        """Build a json_index row from analyzer/storage metadata"""
         schema_decision = metadata.get("schema_decision", {})
         storage_result = metadata.get("storage_result", {})
-        
+
         schema = schema_decision.get("schema", {})
-        record = {
+        return {
             "filename": metadata.get("filename"),
             "schema_name": schema.get(
                 "schema_name",
@@ -180,15 +184,140 @@ class MetadataIndexer:
                 storage_result.get("collection_name") or
                 "unknown"
             ),
-            "analysis": json.dumps(metadata.get("analysis", {})),
+            "analysis": _json_dumps(metadata.get("analysis", {})),
         }
-        
-        result = await self.sql_storage.insert("json_index", record)
-        index_id = result.get("id")
-        
-        logger.info(f"Indexed JSON: {metadata.get('filename')} -> index_id: {index_id}")
-        return index_id or 0
-    
+
+    def _document_record(self, metadata: Dict) -> Dict:
+        """Build a document_index row from processor metadata"""
+        embeddings = _embedding_list(metadata.get("embeddings"))
+        return {
+            "filename": metadata.get("filename"),
+            "mime_type": metadata.get("mime_type"),
+            "category": metadata.get("category", "uncategorized"),
+            "storage_path": str(metadata.get("storage_path", "")),
+            "text": metadata.get("text", "")[:10000],  # Limit text to 10k chars for storage
+            "embeddings": _json_dumps(embeddings) if embeddings else None,
+            "metadata": _json_dumps(metadata.get("metadata", {})),
+        }
+
+    async def _index_with_dedup(
+        self, table: str, metadatas: List[Dict], build, key_of
+    ) -> List[int]:
+        """Insert only metadatas not already indexed this run, filling in
+        cached ids for repeats"""
+        ids: List[int] = [0] * len(metadatas)
+        fresh = []
+        for i, metadata in enumerate(metadatas):
+            key = key_of(metadata)
+            # Without a content hash the key can't tell a re-upload of the
+            # same name with changed bytes from a true repeat, so don't
+            # dedup at all rather than return a stale row's id
+            if key[-1] is None:
+                fresh.append((i, metadata, None))
+                continue
+            cached = self._recent_ids.get(key)
+            if cached is not None:
+                self._recent_ids.move_to_end(key)
+                ids[i] = cached
+            else:
+                fresh.append((i, metadata, key))
+
+        if fresh:
+            records = [build(m) for _, m, _ in fresh]
+            new_ids = await self._insert_batch(table, records)
+            for (i, _, key), new_id in zip(fresh, new_ids):
+                ids[i] = new_id
+                if new_id and key is not None:
+                    self._recent_ids[key] = new_id
+                    while len(self._recent_ids) > self._recent_max:
+                        self._recent_ids.popitem(last=False)
+        return ids
+
+    async def _insert_batch(self, table: str, records: List[Dict]) -> List[int]:
+        """Insert records in one multi-row statement when the storage layer
+        supports it, otherwise as concurrent single inserts"""
+        insert_many = getattr(self.sql_storage, "insert_many", None)
+        if insert_many is not None:
+            results = await insert_many(table, records)
+            return [(r.get("id") or 0) for r in results]
+
+        # Without multi-row support, at least share one transaction across
+        # the batch so it costs one WAL fsync instead of one per row. Losing
+        # an index write on crash is acceptable: the canonical data is on
+        # disk and the index can be rebuilt, so relax synchronous_commit
+        # for the batch when the storage layer lets us
+        transaction = getattr(self.sql_storage, "transaction", None)
+        if transaction is not None and len(records) > 1:
+            async with transaction():
+                execute = getattr(self.sql_storage, "execute", None)
+                if execute is not None:
+                    try:
+                        await execute("SET LOCAL synchronous_commit = off")
+                    except Exception as e:
+                        logger.warning(f"Could not relax synchronous_commit: {e}")
+                results = [
+                    await self.sql_storage.insert(table, r) for r in records
+                ]
+        else:
+            results = await asyncio.gather(
+                *(self.sql_storage.insert(table, r) for r in records)
+            )
+        return [(r.get("id") or 0) for r in results]
+
+    #Add a file
+    async def index_media(self, metadata: Dict) -> int:
+        """Index media file metadata"""
+        ids = await self.index_media_batch([metadata])
+        return ids[0]
+
+    async def index_media_batch(self, metadatas: List[Dict]) -> List[int]:
+        """Index a batch of media file metadata in one round-trip"""
+        await self._ensure_tables_async()
+
+        ids = await self._index_with_dedup(
+            "media_index",
+            metadatas,
+            self._media_record,
+            lambda m: (
+                "media_index",
+                m.get("filename"),
+                str(m.get("storage_path", "")),
+                m.get("content_hash"),
+            ),
+        )
+
+        for metadata, index_id in zip(metadatas, ids):
+            logger.info(f"Indexed media: {metadata.get('filename')} -> index_id: {index_id}")
+        return ids
+
+    #Add a jsonfile
+    async def index_json(self, metadata: Dict) -> int:
+        """Index JSON file metadata"""
+        ids = await self.index_json_batch([metadata])
+        return ids[0]
+
+    async def index_json_batch(self, metadatas: List[Dict]) -> List[int]:
+        """Index a batch of JSON file metadata in one round-trip"""
+        await self._ensure_tables_async()
+
+        ids = await self._index_with_dedup(
+            "json_index",
+            metadatas,
+            self._json_record,
+            lambda m: (
+                "json_index",
+                m.get("filename"),
+                (m.get("storage_result") or {}).get("table_name")
+                or (m.get("storage_result") or {}).get("collection_name")
+                or "unknown",
+                m.get("content_hash"),
+            ),
+        )
+
+        for metadata, index_id in zip(metadatas, ids):
+            logger.info(f"Indexed JSON: {metadata.get('filename')} -> index_id: {index_id}")
+        return ids
+
     # simple filtering
     async def search_media(
         self, category: Optional[str] = None, query: Optional[str] = None, limit: int = 20
@@ -222,24 +351,29 @@ class MetadataIndexer:
     
     async def index_document(self, metadata: Dict) -> int:
         """Index document file metadata"""
+        ids = await self.index_document_batch([metadata])
+        return ids[0]
+
+    async def index_document_batch(self, metadatas: List[Dict]) -> List[int]:
+        """Index a batch of document file metadata in one round-trip"""
         await self._ensure_tables_async()
-        
-        record = {
-            "filename": metadata.get("filename"),
-            "mime_type": metadata.get("mime_type"),
-            "category": metadata.get("category", "uncategorized"),
-            "storage_path": str(metadata.get("storage_path", "")),
-            "text": metadata.get("text", "")[:10000],  # Limit text to 10k chars for storage
-            "embeddings": json.dumps(metadata.get("embeddings")) if metadata.get("embeddings") else None,
-            "metadata": json.dumps(metadata.get("metadata", {})),
-        }
-        
-        result = await self.sql_storage.insert("document_index", record)
-        index_id = result.get("id")
-        
-        logger.info(f"Indexed document: {metadata.get('filename')} -> index_id: {index_id}")
-        return index_id or 0
-    
+
+        ids = await self._index_with_dedup(
+            "document_index",
+            metadatas,
+            self._document_record,
+            lambda m: (
+                "document_index",
+                m.get("filename"),
+                str(m.get("storage_path", "")),
+                m.get("content_hash"),
+            ),
+        )
+
+        for metadata, index_id in zip(metadatas, ids):
+            logger.info(f"Indexed document: {metadata.get('filename')} -> index_id: {index_id}")
+        return ids
+
     async def search_documents(
         self, category: Optional[str] = None, mime_type: Optional[str] = None,
         query: Optional[str] = None, limit: int = 20
@@ -267,27 +401,25 @@ class MetadataIndexer:
     
     async def get_stats(self) -> Dict:
         """Get system statistics"""
-        # Count media files
-        media_count = len(await self.sql_storage.query("media_index", limit=10000))
-        
-        # Count JSON files
-        json_count = len(await self.sql_storage.query("json_index", limit=10000))
-        
-        # Count document files
-        document_count = len(await self.sql_storage.query("document_index", limit=10000))
-        
-        # Get categories
-        media_records = await self.sql_storage.query("media_index", limit=10000)
+        # One scan per table, pipelined: counts, categories and schemas all
+        # come out of the same result sets instead of re-querying each table
+        media_records, json_records, document_records = await asyncio.gather(
+            self.sql_storage.query("media_index", limit=10000),
+            self.sql_storage.query("json_index", limit=10000),
+            self.sql_storage.query("document_index", limit=10000),
+        )
+
+        media_count = len(media_records)
+        json_count = len(json_records)
+        document_count = len(document_records)
+
         categories = set(r.get("category") for r in media_records if r.get("category"))
-        
-        document_records = await self.sql_storage.query("document_index", limit=10000)
-        doc_categories = set(r.get("category") for r in document_records if r.get("category"))
-        categories.update(doc_categories)
-        
-        # Get schemas
-        json_records = await self.sql_storage.query("json_index", limit=10000)
+        categories.update(
+            r.get("category") for r in document_records if r.get("category")
+        )
+
         schemas = set(r.get("schema_name") for r in json_records if r.get("schema_name"))
-        
+
         return {
             "media_files": media_count,
             "json_files": json_count,
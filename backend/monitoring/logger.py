@@ -3,35 +3,37 @@ Monitoring & Logging
 Tracks ingestion, schema decisions, errors, and storage ops
 """
 import logging
+import os
 import sys
 from pythonjsonlogger import jsonlogger
 from datetime import datetime
 
 # creates logger
 def setup_logger(name: str = "smart_storage") -> logging.Logger:
-    """Setup structured JSON logging"""
+    """Setup logging with a single handler (LOG_FORMAT=json|text)"""
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
-    
+
     # Remove existing handlers
     logger.handlers = []
-    
-    # Create console handler with JSON formatter
+
+    # One handler, one formatter: emitting every record twice (JSON on
+    # stdout plus text on stderr) doubled formatting work and log volume
+    log_format = os.getenv("LOG_FORMAT", "json")
     console_handler = logging.StreamHandler(sys.stdout)
-    formatter = jsonlogger.JsonFormatter(
-        "%(asctime)s %(name)s %(levelname)s %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    if log_format == "text":
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+    else:
+        formatter = jsonlogger.JsonFormatter(
+            "%(asctime)s %(name)s %(levelname)s %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
-    
-    # Also add simple formatter for development
-    simple_handler = logging.StreamHandler(sys.stderr)
-    simple_formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    simple_handler.setFormatter(simple_formatter)
-    logger.addHandler(simple_handler)
-    
-    return logger
 
+    # Don't bubble up to the root logger and get emitted again there
+    logger.propagate = False
+
+    return logger
@@ -3,14 +3,29 @@ JSON Analyzer
 Finds structure, patterns, and repeated fields in JSON data
 Handles batch JSON by merging structures
 """
+import asyncio
 import json
+import re
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Set
 from collections import Counter, defaultdict
 import logging
 
+try:
+    # SIMD-accelerated parser; its JSONDecodeError subclasses the stdlib
+    # one, so the detailed error reporting below works with either
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Compiled once; _detect_value_pattern runs per repeated field per batch
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_URL_RE = re.compile(r'^https?://')
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
 
 class JSONAnalyzer:
     """Analyzes JSON structure to determine patterns and consistency"""
@@ -22,23 +37,30 @@ class JSONAnalyzer:
     async def analyze(self, file_path: Path) -> Dict:
         """
         Analyze JSON file and return structure analysis
-        
+
         Args:
             file_path: Path to JSON file
-            
+
         Returns:
             Dictionary with analysis results
         """
+        # Parsing and structure walks are pure CPU; run them off the event
+        # loop so a multi-MB document doesn't stall other requests
+        return await asyncio.to_thread(self._analyze_sync, file_path)
+
+    def _analyze_sync(self, file_path: Path) -> Dict:
+        """Synchronous body of analyze(); runs in a worker thread"""
         try:
-            # Read file content first
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            
+            # Read raw bytes; both parsers accept them directly and we skip
+            # an upfront decode of the whole file
+            raw = Path(file_path).read_bytes()
+
             # Try to parse JSON
             try:
-                data = json.loads(content)
+                data = _json_loads(raw)
             except json.JSONDecodeError as e:
                 # Provide detailed error information with context
+                content = raw.decode("utf-8", errors="replace")
                 lines = content.split('\n')
                 error_msg_parts = [
                     f"Invalid JSON syntax at line {e.lineno}, column {e.colno}: {e.msg}"
@@ -95,11 +117,11 @@ class JSONAnalyzer:
             if isinstance(data, list):
                 if len(data) == 0:
                     raise ValueError("JSON array is empty")
-                return await self._analyze_batch(data)
+                return self._analyze_batch(data)
             elif isinstance(data, dict):
                 if len(data) == 0:
                     raise ValueError("JSON object is empty")
-                return await self._analyze_single(data)
+                return self._analyze_single(data)
             else:
                 raise ValueError(f"JSON root must be an object or array, got {type(data).__name__}")
         
@@ -110,7 +132,7 @@ class JSONAnalyzer:
             logger.error(f"Error analyzing JSON {file_path}: {e}", exc_info=True)
             raise ValueError(f"Error processing JSON file: {str(e)}")
     
-    async def _analyze_single(self, obj: Dict) -> Dict:
+    def _analyze_single(self, obj: Dict) -> Dict:
         """Analyze a single JSON object"""
         structure = self._extract_structure(obj)
         patterns = self._detect_patterns([obj])
@@ -124,22 +146,28 @@ class JSONAnalyzer:
             "is_consistent": True,  # Single object is always consistent
         }
     
-    async def _analyze_batch(self, objects: List[Dict]) -> Dict:
+    def _analyze_batch(self, objects: List[Dict]) -> Dict:
         """Analyze a batch of JSON objects"""
         if not objects:
             raise ValueError("Empty JSON array")
         
         # Extract structure from all objects
         structures = [self._extract_structure(obj) for obj in objects]
-        
+
         # Merge structures
         merged_structure = self._merge_structures(structures)
-        
+
+        # Walk each object for its field paths once; pattern detection and
+        # consistency scoring both reuse the same sets
+        fields_per_object = [self._get_all_fields(obj) for obj in objects]
+
         # Detect patterns across batch
-        patterns = self._detect_patterns(objects)
-        
+        patterns = self._detect_patterns(objects, fields_per_object)
+
         # Calculate consistency
-        consistency = self._calculate_consistency(objects, merged_structure)
+        consistency = self._calculate_consistency(
+            objects, merged_structure, fields_per_object
+        )
         
         return {
             "type": "batch",
@@ -153,58 +181,67 @@ class JSONAnalyzer:
         }
     
     def _extract_structure(self, obj: Any, depth: int = 0, path: str = "") -> Dict:
-        """Recursively extract structure from JSON object"""
-        if depth > self.max_nesting_depth:
-            return {"type": "truncated", "path": path}
-        
-        if isinstance(obj, dict):
-            fields = {}
-            max_depth = depth
-            
-            for key, value in obj.items():
-                field_path = f"{path}.{key}" if path else key
-                field_info = self._extract_structure(value, depth + 1, field_path)
-                fields[key] = field_info
-                if isinstance(field_info, dict):
-                    max_depth = max(max_depth, field_info.get("max_depth", depth))
-            
-            return {
-                "type": "object",
-                "fields": fields,
-                "max_depth": max_depth,
-            }
-        
-        elif isinstance(obj, list):
-            if not obj:
-                return {"type": "array", "item_type": "unknown", "empty": True}
-            
-            # Analyze first few items to determine structure
-            item_structures = [
-                self._extract_structure(item, depth + 1, path)
-                for item in obj[:10]  # Sample first 10 items
-            ]
-            
-            # Determine if items are consistent
-            item_types = [s.get("type") if isinstance(s, dict) else type(s).__name__ 
-                         for s in item_structures]
-            most_common_type = Counter(item_types).most_common(1)[0][0]
-            
-            return {
-                "type": "array",
-                "item_type": most_common_type,
-                "sample_structure": item_structures[0] if item_structures else None,
-                "max_depth": max(
-                    (s.get("max_depth", depth) for s in item_structures if isinstance(s, dict)),
-                    default=depth
-                ),
-            }
-        
-        else:
-            # Primitive type
-            return {
-                "type": type(obj).__name__,
-                "value_sample": str(obj)[:50] if obj is not None else None,
-            }
+        """Extract structure from a JSON object using an explicit stack
+        (no recursion frame overhead or RecursionError on deep trees)"""
+        root: Dict = {}
+        # Each entry is (value, depth, path, result node to fill in place)
+        stack = [(obj, depth, path, root)]
+        # (parent node, child node) in creation order, for bottom-up passes
+        links = []
+        array_nodes = []
+
+        while stack:
+            value, d, p, node = stack.pop()
+
+            if d > self.max_nesting_depth:
+                node.update({"type": "truncated", "path": p})
+                continue
+
+            if isinstance(value, dict):
+                fields: Dict = {}
+                node.update({"type": "object", "fields": fields, "max_depth": d})
+                for key, child in value.items():
+                    child_node: Dict = {}
+                    fields[key] = child_node
+                    links.append((node, child_node))
+                    stack.append(
+                        (child, d + 1, f"{p}.{key}" if p else key, child_node)
+                    )
+
+            elif isinstance(value, list):
+                if not value:
+                    node.update({"type": "array", "item_type": "unknown", "empty": True})
+                    continue
+                item_nodes = []
+                node.update({"type": "array", "_item_nodes": item_nodes, "max_depth": d})
+                array_nodes.append(node)
+                for item in value[:10]:  # Sample first 10 items
+                    child_node = {}
+                    item_nodes.append(child_node)
+                    links.append((node, child_node))
+                    stack.append((item, d + 1, p, child_node))
+
+            else:
+                # Primitive type
+                node.update({
+                    "type": type(value).__name__,
+                    "value_sample": str(value)[:50] if value is not None else None,
+                })
+
+        # Children were created after their parents, so walking the links
+        # in reverse propagates max_depth bottom-up in one pass
+        for parent, child in reversed(links):
+            if "max_depth" in child:
+                parent["max_depth"] = max(parent["max_depth"], child["max_depth"])
+
+        # Summarize sampled array items now that their subtrees are built
+        for node in array_nodes:
+            item_structures = node.pop("_item_nodes")
+            item_types = [s.get("type") for s in item_structures]
+            node["item_type"] = Counter(item_types).most_common(1)[0][0]
+            node["sample_structure"] = item_structures[0] if item_structures else None
+
+        return root
     
     def _merge_structures(self, structures: List[Dict]) -> Dict:
         """Merge multiple structures into one"""
@@ -246,7 +283,9 @@ class JSONAnalyzer:
         # For other types, return the first structure
         return structures[0]
     
-    def _detect_patterns(self, objects: List[Dict]) -> Dict:
+    def _detect_patterns(
+        self, objects: List[Dict], fields_per_object: Optional[List[Set[str]]] = None
+    ) -> Dict:
         """Detect patterns in JSON objects"""
         patterns = {
             "repeated_fields": [],
@@ -254,16 +293,18 @@ class JSONAnalyzer:
             "value_patterns": {},
             "array_lengths": [],
         }
-        
+
         if not objects:
             return patterns
-        
+
         # Collect all field names
+        if fields_per_object is None:
+            fields_per_object = [self._get_all_fields(obj) for obj in objects]
+
         all_fields = set()
         field_presence = defaultdict(int)
-        
-        for obj in objects:
-            fields = self._get_all_fields(obj)
+
+        for fields in fields_per_object:
             all_fields.update(fields)
             for field in fields:
                 field_presence[field] += 1
@@ -291,18 +332,21 @@ class JSONAnalyzer:
         return patterns
     
     def _get_all_fields(self, obj: Any, prefix: str = "") -> Set[str]:
-        """Get all field paths from an object"""
+        """Get all field paths from an object (explicit-stack walk)"""
         fields = set()
-        
-        if isinstance(obj, dict):
-            for key, value in obj.items():
-                field_path = f"{prefix}.{key}" if prefix else key
-                fields.add(field_path)
-                fields.update(self._get_all_fields(value, field_path))
-        elif isinstance(obj, list):
-            for i, item in enumerate(obj[:5]):  # Sample first 5 items
-                fields.update(self._get_all_fields(item, f"{prefix}[{i}]"))
-        
+        stack = [(obj, prefix)]
+
+        while stack:
+            current, path = stack.pop()
+            if isinstance(current, dict):
+                for key, value in current.items():
+                    field_path = f"{path}.{key}" if path else key
+                    fields.add(field_path)
+                    stack.append((value, field_path))
+            elif isinstance(current, list):
+                for i, item in enumerate(current[:5]):  # Sample first 5 items
+                    stack.append((item, f"{path}[{i}]"))
+
         return fields
     
     def _has_field(self, obj: Any, field_path: str) -> bool:
@@ -333,37 +377,43 @@ class JSONAnalyzer:
         """Detect pattern in values (email, URL, date, etc.)"""
         if not values:
             return None
-        
-        # Check for email pattern
-        import re
-        email_pattern = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
-        if all(isinstance(v, str) and email_pattern.match(v) for v in values[:5]):
-            return "email"
-        
-        # Check for URL pattern
-        url_pattern = re.compile(r'^https?://')
-        if all(isinstance(v, str) and url_pattern.match(v) for v in values[:5]):
-            return "url"
-        
-        # Check for date pattern
-        date_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}')
-        if all(isinstance(v, str) and date_pattern.match(v) for v in values[:5]):
-            return "date"
-        
+
+        sample = values[:5]
+
+        # Every candidate pattern needs string values; bail out once and
+        # check each pattern over the sample in a single pass
+        if not all(isinstance(v, str) for v in sample):
+            return None
+
+        for pattern_type, regex in (
+            ("email", _EMAIL_RE),
+            ("url", _URL_RE),
+            ("date", _DATE_RE),
+        ):
+            if all(regex.match(v) for v in sample):
+                return pattern_type
+
         return None
     
-    def _calculate_consistency(self, objects: List[Dict], structure: Dict) -> Dict:
+    def _calculate_consistency(
+        self,
+        objects: List[Dict],
+        structure: Dict,
+        fields_per_object: Optional[List[Set[str]]] = None,
+    ) -> Dict:
         """Calculate consistency metrics"""
         if not objects:
             return {"overall": 0.0}
-        
+
         # Get all fields from structure
         structure_fields = set(self._get_all_fields_from_structure(structure))
-        
+
         # Calculate field presence across objects
+        if fields_per_object is None:
+            fields_per_object = [self._get_all_fields(obj) for obj in objects]
+
         field_presence = defaultdict(int)
-        for obj in objects:
-            obj_fields = self._get_all_fields(obj)
+        for obj_fields in fields_per_object:
             for field in structure_fields:
                 if field in obj_fields:
                     field_presence[field] += 1
@@ -1,189 +1,310 @@
-# """
-# Media Processor
-# Generates embeddings via CLIP/ViT and performs semantic classification
-# """
-# import torch
-# from torchvision import transforms
-# from transformers import CLIPProcessor, CLIPModel
-# from PIL import Image
-# import numpy as np
-# from pathlib import Path
-# import asyncio
-# from typing import Dict, List, Optional
-# import logging
-
-# logger = logging.getLogger(__name__)
-
-# class MediaProcessor:
-#     """Processes media files (images/videos) to generate embeddings and classifications"""
-    
-#     def __init__(self):
-#         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-#         logger.info(f"Initializing MediaProcessor on device: {self.device}")
-        
-#         # Load CLIP model for image embeddings
-#         try:
-#             self.clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-#             self.clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-#             self.clip_model.to(self.device)
-#             self.clip_model.eval()
-#             logger.info("CLIP model loaded successfully")
-#         except Exception as e:
-#             logger.warning(f"Could not load CLIP model: {e}. Using fallback.")
-#             self.clip_model = None
-#             self.clip_processor = None
-        
-#         # Predefined categories for classification
-#         self.categories = [
-#             "nature", "animals", "people", "architecture", "food",
-#             "vehicles", "technology", "art", "sports", "travel",
-#             "business", "medical", "education", "entertainment", "other"
-#         ]
-        
-#         # Image preprocessing
-#         self.image_transform = transforms.Compose([
-#             transforms.Resize((224, 224)),
-#             transforms.ToTensor(),
-#             transforms.Normalize(
-#                 mean=[0.485, 0.456, 0.406],
-#                 std=[0.229, 0.224, 0.225]
-#             ),
-#         ])
-    
-#     async def process(self, file_path: Path, mime_type: str) -> Dict:
-#         """
-#         Process media file and return embeddings, category, and metadata
-        
-#         Args:
-#             file_path: Path to media file
-#             mime_type: MIME type of the file
-            
-#         Returns:
-#             Dictionary with embeddings, category, and metadata
-#         """
-#         try:
-#             if mime_type.startswith("image/"):
-#                 return await self._process_image(file_path, mime_type)
-#             elif mime_type.startswith("video/"):
-#                 return await self._process_video(file_path, mime_type)
-#             else:
-#                 raise ValueError(f"Unsupported media type: {mime_type}")
-#         except Exception as e:
-#             logger.error(f"Error processing media {file_path}: {e}", exc_info=True)
-#             # Return default values on error
-#             return {
-#                 "embeddings": None,
-#                 "category": "uncategorized",
-#                 "metadata": {"error": str(e)},
-#             }
-    
-#     async def _process_image(self, file_path: Path, mime_type: str) -> Dict:
-#         """Process image file"""
-#         loop = asyncio.get_event_loop()
-        
-#         # Load image
-#         image = Image.open(file_path).convert("RGB")
-        
-#         # Extract basic metadata
-#         metadata = {
-#             "width": image.width,
-#             "height": image.height,
-#             "format": image.format,
-#             "mode": image.mode,
-#             "mime_type": mime_type,
-#         }
-        
-#         # Generate embeddings
-#         embeddings = None
-#         category = "uncategorized"
-        
-#         if self.clip_model and self.clip_processor:
-#             try:
-#                 # Generate CLIP embeddings
-#                 inputs = self.clip_processor(
-#                     images=image,
-#                     return_tensors="pt",
-#                     padding=True
-#                 ).to(self.device)
-                
-#                 with torch.no_grad():
-#                     image_features = self.clip_model.get_image_features(**inputs)
-#                     embeddings = image_features.cpu().numpy().flatten().tolist()
-                
-#                 # Classify using text-image similarity
-#                 category = await loop.run_in_executor(
-#                     None, self._classify_image, image, embeddings
-#                 )
-                
-#             except Exception as e:
-#                 logger.warning(f"CLIP processing failed: {e}")
-        
-#         return {
-#             "embeddings": embeddings,
-#             "category": category,
-#             "metadata": metadata,
-#         }
-    
-#     def _classify_image(self, image: Image.Image, embeddings: List[float]) -> str:
-#         """Classify image into category using CLIP"""
-#         if not self.clip_model or not embeddings:
-#             return "uncategorized"
-        
-#         try:
-#             # Create text prompts for categories
-#             category_texts = [f"a photo of {cat}" for cat in self.categories]
-            
-#             # Get text embeddings
-#             text_inputs = self.clip_processor(
-#                 text=category_texts,
-#                 return_tensors="pt",
-#                 padding=True
-#             ).to(self.device)
-            
-#             with torch.no_grad():
-#                 text_features = self.clip_model.get_text_features(**text_inputs)
-#                 text_features = text_features / text_features.norm(dim=-1, keepdim=True)
-            
-#             # Compute similarity
-#             image_emb = torch.tensor(embeddings).unsqueeze(0).to(self.device)
-#             image_emb = image_emb / image_emb.norm(dim=-1, keepdim=True)
-            
-#             similarity = (image_emb @ text_features.T).cpu().numpy().flatten()
-#             best_category_idx = np.argmax(similarity)
-            
-#             # Only return category if similarity is above threshold
-#             if similarity[best_category_idx] > 0.2:
-#                 return self.categories[best_category_idx]
-#             else:
-#                 return "uncategorized"
-        
-#         except Exception as e:
-#             logger.warning(f"Classification failed: {e}")
-#             return "uncategorized"
-    
-#     async def _process_video(self, file_path: Path, mime_type: str) -> Dict:
-#         """Process video file (extract frame and process as image)"""
-#         # For now, we'll extract a frame from the video
-#         # In production, use ffmpeg or similar
-#         logger.info(f"Video processing for {file_path} - using placeholder")
-        
-#         metadata = {
-#             "mime_type": mime_type,
-#             "type": "video",
-#             "note": "Full video processing requires ffmpeg",
-#         }
-        
-#         # TODO: Implement video frame extraction
-#         # For now, return basic metadata
-#         return {
-#             "embeddings": None,
-#             "category": "uncategorized",
-#             "metadata": metadata,
-#         }
-    
-#     def get_embeddings_dim(self) -> int:
-#         """Get dimension of embeddings"""
-#         if self.clip_model:
-#             return 512  # CLIP ViT-B/32 produces 512-dim embeddings
-#         return 0
+"""
+Media Processor (CLIP backend)
+Generates embeddings via CLIP/ViT and performs semantic classification
+"""
+import torch
+from transformers import CLIPProcessor, CLIPModel
+from PIL import Image
+from pathlib import Path
+import asyncio
+import os
+from typing import Dict, List, Optional
+import logging
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+except ImportError:
+    TurboJPEG = None
+
+logger = logging.getLogger(__name__)
+
+# Micro-batching knobs: concurrent process() calls are coalesced into one
+# forward pass of up to CLIP_BATCH_MAX images, waiting at most
+# CLIP_BATCH_WAIT_MS for stragglers before running a partial batch
+CLIP_BATCH_MAX = int(os.getenv("CLIP_BATCH_MAX", "16"))
+CLIP_BATCH_WAIT = float(os.getenv("CLIP_BATCH_WAIT_MS", "5")) / 1000.0
+
+class MediaProcessor:
+    """Processes media files (images/videos) to generate embeddings and classifications"""
+
+    def __init__(self):
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info(f"Initializing MediaProcessor on device: {self.device}")
+
+        # Load CLIP model for image embeddings
+        try:
+            self.clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
+            self.clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+            self.clip_model.to(self.device)
+            self.clip_model.eval()
+            # Run inference in half precision: fp16 on GPU (tensor cores,
+            # half the memory bandwidth), bf16 on CPU. Cosine similarity on
+            # image features is insensitive to the precision drop
+            try:
+                if self.device == "cuda":
+                    self.clip_model = self.clip_model.half().to(
+                        memory_format=torch.channels_last
+                    )
+                else:
+                    self.clip_model = self.clip_model.to(torch.bfloat16)
+            except Exception as e:
+                logger.warning(f"Half-precision conversion failed, staying fp32: {e}")
+            self._model_dtype = next(self.clip_model.parameters()).dtype
+            # Fuse attention/MLP kernels and capture CUDA graphs; falls back
+            # to eager if the backend is unavailable on this platform
+            try:
+                self.clip_model = torch.compile(
+                    self.clip_model, mode="reduce-overhead", fullgraph=False
+                )
+            except Exception as e:
+                logger.warning(f"torch.compile unavailable, running eager: {e}")
+            logger.info("CLIP model loaded successfully")
+        except Exception as e:
+            logger.warning(f"Could not load CLIP model: {e}. Using fallback.")
+            self.clip_model = None
+            self.clip_processor = None
+
+        # Predefined categories for classification
+        self.categories = [
+            "nature", "animals", "people", "architecture", "food",
+            "vehicles", "technology", "art", "sports", "travel",
+            "business", "medical", "education", "entertainment", "other"
+        ]
+
+        # Encode the category prompts once: the text tower output never
+        # changes, so classification per image is a single matmul against
+        # this cached [num_categories, 512] matrix instead of a full text
+        # transformer pass per call
+        self.text_features = None
+        if self.clip_model and self.clip_processor:
+            try:
+                category_texts = [f"a photo of {cat}" for cat in self.categories]
+                text_inputs = self.clip_processor(
+                    text=category_texts,
+                    return_tensors="pt",
+                    padding=True
+                ).to(self.device)
+                with torch.inference_mode():
+                    text_features = self.clip_model.get_text_features(**text_inputs)
+                    self.text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+            except Exception as e:
+                logger.warning(f"Could not precompute category text features: {e}")
+
+        # SIMD JPEG decoder (libjpeg-turbo); PIL remains the fallback and
+        # the only path for non-JPEG formats
+        self._tj = None
+        if TurboJPEG is not None:
+            try:
+                self._tj = TurboJPEG()
+            except Exception as e:
+                logger.warning(f"TurboJPEG unavailable, using PIL decode: {e}")
+
+        # Micro-batch queue and worker are created lazily on first use so
+        # they bind to the running event loop
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_worker: Optional[asyncio.Task] = None
+
+    async def process(self, file_path: Path, mime_type: str) -> Dict:
+        """
+        Process media file and return embeddings, category, and metadata
+
+        Args:
+            file_path: Path to media file
+            mime_type: MIME type of the file
+
+        Returns:
+            Dictionary with embeddings, category, and metadata
+        """
+        try:
+            if mime_type.startswith("image/"):
+                return await self._process_image(file_path, mime_type)
+            elif mime_type.startswith("video/"):
+                return await self._process_video(file_path, mime_type)
+            else:
+                raise ValueError(f"Unsupported media type: {mime_type}")
+        except Exception as e:
+            logger.error(f"Error processing media {file_path}: {e}", exc_info=True)
+            # Return default values on error
+            return {
+                "embeddings": None,
+                "category": "uncategorized",
+                "metadata": {"error": str(e)},
+            }
+
+    def _decode_jpeg(self, file_path: Path) -> Image.Image:
+        """Decode a JPEG with libjpeg-turbo, using fractional DCT scaling so
+        large photos come out of decode near the 224px model input instead
+        of paying a full-resolution decode plus bilinear resize"""
+        with open(file_path, "rb") as f:
+            raw = f.read()
+        width, height, _, _ = self._tj.decode_header(raw)
+        scale = None
+        for num, den in sorted(
+            self._tj.scaling_factors, key=lambda s: s[0] / s[1]
+        ):
+            if num >= den:
+                break
+            if min(width * num // den, height * num // den) >= 224:
+                scale = (num, den)
+                break
+        if scale:
+            arr = self._tj.decode(raw, pixel_format=TJPF_RGB, scaling_factor=scale)
+        else:
+            arr = self._tj.decode(raw, pixel_format=TJPF_RGB)
+        return Image.fromarray(arr)
+
+    async def _process_image(self, file_path: Path, mime_type: str) -> Dict:
+        """Process image file"""
+        # Metadata comes from the header (PIL defers the pixel decode),
+        # not from the decoded image: the TurboJPEG path below decodes at
+        # a fractional DCT scale, so its dimensions are not the file's
+        header = Image.open(file_path)
+        metadata = {
+            "width": header.width,
+            "height": header.height,
+            "format": header.format,
+            "mode": header.mode,
+            "mime_type": mime_type,
+        }
+
+        # Load image
+        if mime_type == "image/jpeg" and self._tj is not None:
+            try:
+                image = self._decode_jpeg(file_path)
+            except Exception as e:
+                logger.warning(f"TurboJPEG decode failed, using PIL: {e}")
+                image = header.convert("RGB")
+        else:
+            image = header.convert("RGB")
+
+        # Generate embeddings
+        embeddings = None
+        category = "uncategorized"
+
+        if self.clip_model and self.clip_processor:
+            try:
+                # Coalesced with concurrent callers into one forward pass
+                image_features = await self._embed_image(image)
+
+                # Classify against the cached text features while the image
+                # embedding is still a device tensor; convert to a list only
+                # at the return boundary
+                category = self._classify_image(image_features)
+                embeddings = image_features.float().cpu().numpy().flatten().tolist()
+
+            except Exception as e:
+                logger.warning(f"CLIP processing failed: {e}")
+
+        return {
+            "embeddings": embeddings,
+            "category": category,
+            "metadata": metadata,
+        }
+
+    async def _embed_image(self, image: Image.Image) -> torch.Tensor:
+        """Queue an image for the micro-batch scheduler and await its
+        embedding row"""
+        if self._batch_queue is None:
+            self._batch_queue = asyncio.Queue()
+            self._batch_worker = asyncio.get_running_loop().create_task(
+                self._batch_loop()
+            )
+        future = asyncio.get_running_loop().create_future()
+        self._batch_queue.put_nowait((image, future))
+        return await future
+
+    async def _batch_loop(self):
+        """Background scheduler: drain pending images into batches of up to
+        CLIP_BATCH_MAX, run one batched forward pass, and fan the rows back
+        out to the awaiting futures"""
+        loop = asyncio.get_running_loop()
+        while True:
+            image, future = await self._batch_queue.get()
+            batch = [(image, future)]
+            deadline = loop.time() + CLIP_BATCH_WAIT
+            while len(batch) < CLIP_BATCH_MAX:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._batch_queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            images = [img for img, _ in batch]
+            try:
+                features = await asyncio.to_thread(self._encode_batch, images)
+                for (_, fut), row in zip(batch, features):
+                    if not fut.done():
+                        fut.set_result(row)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def _encode_batch(self, images: List[Image.Image]) -> torch.Tensor:
+        """Run one CLIP forward pass over a stacked batch of images"""
+        inputs = self.clip_processor(
+            images=images,
+            return_tensors="pt",
+            padding=True
+        ).to(self.device)
+        inputs["pixel_values"] = inputs["pixel_values"].to(
+            dtype=self._model_dtype, memory_format=torch.channels_last
+        )
+        with torch.inference_mode():
+            return self.clip_model.get_image_features(**inputs)
+
+    def _classify_image(self, image_features: torch.Tensor) -> str:
+        """Classify image into category via similarity against the cached
+        category text features (one [1,512] x [512,15] matmul)"""
+        if self.text_features is None:
+            return "uncategorized"
+
+        try:
+            with torch.inference_mode():
+                image_emb = image_features / image_features.norm(dim=-1, keepdim=True)
+                similarity = (image_emb @ self.text_features.T).squeeze(0)
+                # max() gives score and index together, so one host read
+                # covers both instead of separate argmax and item() syncs
+                score, best_idx = similarity.max(dim=-1)
+                score, best_idx = torch.stack(
+                    (score, best_idx.to(score.dtype))
+                ).tolist()
+
+                # Only return category if similarity is above threshold
+                if score > 0.2:
+                    return self.categories[int(best_idx)]
+                return "uncategorized"
+
+        except Exception as e:
+            logger.warning(f"Classification failed: {e}")
+            return "uncategorized"
+
+    async def _process_video(self, file_path: Path, mime_type: str) -> Dict:
+        """Process video file (extract frame and process as image)"""
+        # For now, we'll extract a frame from the video
+        # In production, use ffmpeg or similar
+        logger.info(f"Video processing for {file_path} - using placeholder")
+
+        metadata = {
+            "mime_type": mime_type,
+            "type": "video",
+            "note": "Full video processing requires ffmpeg",
+        }
+
+        # TODO: Implement video frame extraction
+        # For now, return basic metadata
+        return {
+            "embeddings": None,
+            "category": "uncategorized",
+            "metadata": metadata,
+        }
+
+    def get_embeddings_dim(self) -> int:
+        """Get dimension of embeddings"""
+        if self.clip_model:
+            return 512  # CLIP ViT-B/32 produces 512-dim embeddings
+        return 0
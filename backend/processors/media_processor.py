@@ -4,30 +4,140 @@ from PIL import Image
 import numpy as np
 from pathlib import Path
 import asyncio
+import hashlib
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict
 import logging
 import json
 from urllib.request import urlopen
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+except ImportError:
+    TurboJPEG = None
+
 logger = logging.getLogger(__name__)
 
+# Micro-batching: concurrent process() calls are stacked into one forward
+# of up to RESNET_BATCH_MAX inputs after at most RESNET_BATCH_WAIT_MS
+RESNET_BATCH_MAX = int(os.getenv("RESNET_BATCH_MAX", "32"))
+RESNET_BATCH_WAIT = float(os.getenv("RESNET_BATCH_WAIT_MS", "8")) / 1000.0
+
+# Re-ingested assets skip the forward entirely: results are memoized by
+# content hash in a bounded in-process LRU
+MEDIA_RESULT_CACHE_SIZE = int(os.getenv("MEDIA_RESULT_CACHE_SIZE", "512"))
+
+# Videos are summarized from this many uniformly spaced frames, run as
+# one batched forward rather than per-frame passes
+VIDEO_SAMPLE_FRAMES = int(os.getenv("VIDEO_SAMPLE_FRAMES", "8"))
+
+
+@lru_cache(maxsize=1)
+def _load_backbone(device: str):
+    """Process-wide ResNet50 weights: re-instantiating MediaProcessor
+    reuses the loaded model instead of reading ~100 MB again"""
+    model = models.resnet50(pretrained=True)
+    model.eval()
+    model.to(device)
+    return model
+
+
+@lru_cache(maxsize=1)
+def _load_imagenet_labels():
+    """Load the 1000 ImageNet class labels once per process: bundled
+    resource if one is shipped, else the on-disk cache, else one HTTP
+    fetch that fills the cache so later starts never touch the network"""
+    try:
+        from importlib import resources
+        resource = resources.files(__package__).joinpath(
+            "data/imagenet_labels.json"
+        )
+        if resource.is_file():
+            return json.loads(resource.read_text())
+    except Exception:
+        pass
+
+    cache_path = (
+        Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache"))
+        / "smart_storage"
+        / "imagenet_labels.json"
+    )
+    if cache_path.is_file():
+        try:
+            return json.loads(cache_path.read_text())
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not read cached labels: {e}")
+
+    url = "https://raw.githubusercontent.com/anishathalye/imagenet-simple-labels/master/imagenet-simple-labels.json"
+    with urlopen(url) as f:
+        labels = json.load(f)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(labels))
+    except OSError as e:
+        logger.warning(f"Could not cache labels: {e}")
+    return labels
+
+
+class _DualHeadResNet(torch.nn.Module):
+    """ResNet50 forward returning (pooled features, logits) as real outputs.
+
+    Used instead of a forward hook on avgpool: the backbone is a shared
+    process-wide singleton, so hooks registered on it would leak across
+    instances, and compilers (TensorRT, FX quantization) drop Python
+    hooks from the fused graph anyway"""
+
+    def __init__(self, resnet):
+        super().__init__()
+        self.resnet = resnet
+
+    def forward(self, x):
+        r = self.resnet
+        x = r.conv1(x)
+        x = r.bn1(x)
+        x = r.relu(x)
+        x = r.maxpool(x)
+        x = r.layer1(x)
+        x = r.layer2(x)
+        x = r.layer3(x)
+        x = r.layer4(x)
+        pooled = r.avgpool(x)
+        logits = r.fc(torch.flatten(pooled, 1))
+        return pooled, logits
+
 class MediaProcessor:
     """Processes media files (images/videos) to generate embeddings and classify using ResNet50 (ImageNet)"""
     
     def __init__(self):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(f"Initializing MediaProcessor on device: {self.device}")
-        
-        # Load pre-trained ResNet50
-        self.resnet = models.resnet50(pretrained=True)
-        self.resnet.eval()
-        self.resnet.to(self.device)
-        
-        # Embedding model: everything except final classification layer
-        self.embedding_model = torch.nn.Sequential(*list(self.resnet.children())[:-1])
-        self.classifier = self.resnet  # full model for predictions
-        
-        # Image preprocessing
+
+        if self.device == "cuda":
+            # Inputs are always 224x224, so let cuDNN autotune the conv
+            # algorithm once per layer and reuse it, and allow TF32 math
+            # for whatever fp32 ops remain outside the fp16 paths
+            torch.backends.cudnn.benchmark = True
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            torch.set_float32_matmul_precision("high")
+
+        # Model weights, compiled variants and labels load in warmup(),
+        # off the event loop, so constructing the processor stays cheap
+        self.resnet = None
+        self.classifier = None
+        self.imagenet_labels = None
+        self._trt_model = None
+        self._int8_model = None
+        self._int8_prepared = None
+        self._int8_calib_left = int(os.getenv("RESNET_INT8_CALIB", "32"))
+        self._warmed = False
+        self._warmup_lock = None
+
+        # Image preprocessing (CPU fallback path)
         self.image_transform = transforms.Compose([
             transforms.Resize((224, 224)),
             transforms.ToTensor(),
@@ -36,20 +146,164 @@ class MediaProcessor:
                 std=[0.229, 0.224, 0.225]
             ),
         ])
+
+        # Cached broadcastable mean/std for the fused GPU preprocess
+        self._mean = torch.tensor(
+            [0.485, 0.456, 0.406], device=self.device
+        ).view(1, 3, 1, 1)
+        self._std = torch.tensor(
+            [0.229, 0.224, 0.225], device=self.device
+        ).view(1, 3, 1, 1)
         
-        # Load ImageNet class labels
+        # Map ImageNet labels to meaningful categories
+        self._init_category_mapping()
+
+        # Model forwards hold the GIL for their whole duration; give them
+        # their own single worker instead of the shared default executor so
+        # an inference burst can't starve the gateway's other offloaded work
+        self._infer_pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="resnet-infer"
+        )
+
+        # Decode/preprocess run here, off the event loop; two workers keep
+        # the batcher fed without oversubscribing the CPU
+        self._prep_pool = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="media-prep"
+        )
+
+        # Micro-batch queue/worker, created lazily so they bind to the
+        # running event loop
+        self._batch_queue = None
+        self._batch_worker = None
+
+        # Pinned staging buffer + side stream: H2D copies go async and
+        # overlap whatever the default stream is computing. Both are
+        # shared mutable state across the prep workers, hence the lock
+        self._copy_stream = torch.cuda.Stream() if self.device == "cuda" else None
+        self._pinned = None
+        self._copy_lock = threading.Lock()
+
+        # Content-hash keyed LRU of (embeddings, category, metadata)
+        self._result_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+        # SIMD JPEG decoder for the CPU path (GPU JPEGs take NVJPEG)
+        self._tj = None
+        if TurboJPEG is not None:
+            try:
+                self._tj = TurboJPEG()
+            except Exception as e:
+                logger.warning(f"TurboJPEG unavailable, using PIL decode: {e}")
+
+    async def warmup(self):
+        """Load model weights and labels off the event loop.
+
+        Called from the gateway's startup hook (or implicitly on the
+        first process() call); weights and the label fetch run in
+        parallel worker threads, so the server accepts connections while
+        both are still loading. Safe to call repeatedly.
+        """
+        if self._warmed:
+            return
+        # Lock is created lazily so it binds to the running loop
+        if self._warmup_lock is None:
+            self._warmup_lock = asyncio.Lock()
+        async with self._warmup_lock:
+            if self._warmed:
+                return
+            self.imagenet_labels, _ = await asyncio.gather(
+                asyncio.to_thread(self._load_labels),
+                asyncio.to_thread(self._setup_model),
+            )
+            self._warmed = True
+
+    def _load_labels(self):
+        """ImageNet labels with an index-named fallback if the load fails"""
         try:
-            url = "https://raw.githubusercontent.com/anishathalye/imagenet-simple-labels/master/imagenet-simple-labels.json"
-            with urlopen(url) as f:
-                self.imagenet_labels = json.load(f)
+            labels = _load_imagenet_labels()
             logger.info("Loaded ImageNet labels successfully")
+            return labels
         except Exception as e:
             logger.warning(f"Could not load ImageNet labels: {e}")
-            self.imagenet_labels = [f"class_{i}" for i in range(1000)]
-        
-        # Map ImageNet labels to meaningful categories
-        self._init_category_mapping()
-    
+            return [f"class_{i}" for i in range(1000)]
+
+    def _setup_model(self):
+        """Load ResNet50 and build the compiled/quantized variants"""
+        # Load pre-trained ResNet50 (shared per process)
+        self.resnet = _load_backbone(self.device)
+        # NHWC layout matches cuDNN's Tensor-Core conv kernels (and oneDNN
+        # on CPU), avoiding implicit transposes inside the forward
+        self.resnet = self.resnet.to(memory_format=torch.channels_last)
+
+        # Per-instance dual-head wrapper: one pass yields both the 2048-d
+        # pooled features and the logits, instead of running the backbone
+        # twice per image. A wrapper rather than a forward hook on avgpool
+        # because the backbone is a shared singleton - hooks registered on
+        # it would accumulate across instances and write into whichever
+        # instance registered them
+        self.classifier = _DualHeadResNet(self.resnet).eval()
+
+        # Optional TensorRT engine (TRT_ENABLE=1 on CUDA): fused fp16
+        # kernels, roughly 2x over eager for ResNet50
+        if os.getenv("TRT_ENABLE") == "1" and self.device == "cuda":
+            try:
+                import torch_tensorrt
+                self._trt_model = torch_tensorrt.compile(
+                    self.classifier.to(self.device),
+                    inputs=[torch_tensorrt.Input((1, 3, 224, 224))],
+                    enabled_precisions={torch.half},
+                )
+                logger.info("Compiled ResNet50 with TensorRT (fp16)")
+            except Exception as e:
+                logger.warning(f"TensorRT compile failed, using eager model: {e}")
+                self._trt_model = None
+
+        # Fuse the eager forward with Inductor + CUDA graph capture; shapes
+        # are pinned to 224x224 so one warmup covers the steady state
+        if self._trt_model is None:
+            try:
+                compiled = torch.compile(self.classifier, mode="reduce-overhead")
+                with torch.no_grad():
+                    dummy = torch.zeros(
+                        1, 3, 224, 224, device=self.device
+                    ).to(memory_format=torch.channels_last)
+                    compiled(dummy)
+                self.classifier = compiled
+                logger.info("Compiled ResNet50 with torch.compile")
+            except Exception as e:
+                logger.warning(f"torch.compile unavailable, running eager: {e}")
+
+        # Optional CPU INT8 static quantization (RESNET_INT8=1): observers
+        # calibrate on the first real batches, then the model converts to
+        # int8 kernels (VNNI on x86)
+        if os.getenv("RESNET_INT8") == "1" and self.device == "cpu":
+            try:
+                from torch.ao.quantization import get_default_qconfig_mapping
+                from torch.ao.quantization.quantize_fx import prepare_fx
+                self._int8_prepared = prepare_fx(
+                    _DualHeadResNet(self.resnet).eval(),
+                    get_default_qconfig_mapping("fbgemm"),
+                    example_inputs=(torch.zeros(1, 3, 224, 224),),
+                )
+                logger.info(
+                    f"INT8 enabled; calibrating on first "
+                    f"{self._int8_calib_left} batches"
+                )
+            except Exception as e:
+                logger.warning(f"INT8 quantization unavailable: {e}")
+                self._int8_prepared = None
+
+        # Warmup forward so cuDNN's autotuner benchmarks now instead of
+        # on the first user request
+        if self.device == "cuda":
+            try:
+                with torch.no_grad():
+                    self.classifier(
+                        torch.zeros(1, 3, 224, 224, device=self.device)
+                        .to(memory_format=torch.channels_last)
+                    )
+            except Exception as e:
+                logger.warning(f"Warmup forward failed: {e}")
+
     def _init_category_mapping(self):
         """Initialize mapping from ImageNet labels to meaningful categories"""
         # Map ImageNet labels to broader, more meaningful categories
@@ -105,6 +359,8 @@ class MediaProcessor:
     
     async def process(self, file_path: Path, mime_type: str) -> Dict:
         """Process media file and return embeddings, category, and metadata"""
+        # No-op once warmed; covers deployments without the startup hook
+        await self.warmup()
         try:
             if mime_type.startswith("image/"):
                 return await self._process_image(file_path, mime_type)
@@ -120,14 +376,46 @@ class MediaProcessor:
                 "metadata": {"error": str(e)},
             }
     
-    async def _process_image(self, file_path: Path, mime_type: str) -> Dict:
-        """Process image using ResNet embeddings and ImageNet classification"""
-        loop = asyncio.get_event_loop()
-        
-        # Load image
-        image = Image.open(file_path).convert("RGB")
-        
-        # Metadata
+    def _to_device(self, tensor: torch.Tensor) -> torch.Tensor:
+        """Move a preprocessed CPU tensor to the GPU via a pinned staging
+        buffer and the side stream, so the PCIe copy runs asynchronously
+        instead of blocking on a pageable transfer"""
+        if self.device != "cuda":
+            return tensor
+        # The staging buffer and side stream are shared across the prep
+        # workers; the lock keeps one thread from synchronizing and then
+        # overwriting (or reallocating, for a different batch shape) the
+        # buffer while another thread's async copy is still reading it
+        with self._copy_lock:
+            # Don't overwrite the staging buffer while a previous copy is
+            # in flight
+            self._copy_stream.synchronize()
+            if self._pinned is None or self._pinned.shape != tensor.shape:
+                self._pinned = torch.empty_like(tensor, pin_memory=True)
+            self._pinned.copy_(tensor)
+            with torch.cuda.stream(self._copy_stream):
+                gpu = self._pinned.to(self.device, non_blocking=True)
+            torch.cuda.current_stream().wait_stream(self._copy_stream)
+            return gpu
+
+    def _preprocess_gpu(self, file_path: Path) -> torch.Tensor:
+        """Decode a JPEG with NVJPEG and resize+normalize on the GPU — no
+        intermediate fp32 CPU tensor, one pass over the pixels"""
+        from torchvision.io import read_file, decode_jpeg
+
+        img = decode_jpeg(read_file(str(file_path)), device=self.device)
+        img = img.unsqueeze(0).float()
+        img = torch.nn.functional.interpolate(
+            img, (224, 224), mode="bilinear", align_corners=False
+        )
+        return img.div_(255).sub_(self._mean).div_(self._std)
+
+    def _prepare_image(self, file_path: Path, mime_type: str):
+        """Synchronous decode + preprocess; runs on the prep pool so the
+        event loop never blocks on PIL or tensor math"""
+        # Load image header for metadata (PIL defers the pixel decode)
+        image = Image.open(file_path)
+
         metadata = {
             "width": image.width,
             "height": image.height,
@@ -135,143 +423,365 @@ class MediaProcessor:
             "mode": image.mode,
             "mime_type": mime_type,
         }
-        
-        # Preprocess image
-        image_tensor = self.image_transform(image).unsqueeze(0).to(self.device)
-        
-        # Generate embeddings
-        with torch.no_grad():
-            features = self.embedding_model(image_tensor)
-            embeddings = features.cpu().numpy().flatten().tolist()
-        
-        # Predict category using ResNet classifier
-        def predict_category():
-            with torch.no_grad():
-                outputs = self.classifier(image_tensor)
-                probs = torch.nn.functional.softmax(outputs, dim=1)
-                top_idx = torch.argmax(probs, dim=1).item()
-                imagenet_label = self.imagenet_labels[top_idx]
-                # Map to meaningful category
-                return self._map_to_category(imagenet_label)
-        
-        category = await loop.run_in_executor(None, predict_category)
-        
+
+        # Preprocess: fused GPU decode/resize/normalize for JPEGs on CUDA,
+        # PIL + transforms everywhere else
+        image_tensor = None
+        if self.device == "cuda" and mime_type == "image/jpeg":
+            try:
+                image_tensor = self._preprocess_gpu(file_path)
+            except Exception as e:
+                logger.warning(f"GPU preprocess failed, using CPU path: {e}")
+        if image_tensor is None:
+            pil_image = None
+            if mime_type == "image/jpeg" and self._tj is not None:
+                try:
+                    with open(file_path, "rb") as f:
+                        arr = self._tj.decode(f.read(), pixel_format=TJPF_RGB)
+                    pil_image = Image.fromarray(arr)
+                except Exception as e:
+                    logger.warning(f"TurboJPEG decode failed, using PIL: {e}")
+            if pil_image is None:
+                pil_image = image.convert("RGB")
+            image_tensor = self._to_device(
+                self.image_transform(pil_image).unsqueeze(0)
+            )
+        return metadata, image_tensor
+
+    @staticmethod
+    def _hash_file(file_path: Path) -> str:
+        """Content hash for memoization; blake2b streams at memory speed,
+        negligible next to a ResNet forward"""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def _process_image(self, file_path: Path, mime_type: str) -> Dict:
+        """Process image using ResNet embeddings and ImageNet classification"""
+        loop = asyncio.get_event_loop()
+
+        file_hash = await loop.run_in_executor(
+            self._prep_pool, self._hash_file, file_path
+        )
+        hit = self._result_cache.get(file_hash)
+        if hit is not None:
+            self._result_cache.move_to_end(file_hash)
+            embeddings, category, metadata = hit
+            return {
+                "embeddings": embeddings,
+                "category": category,
+                "metadata": metadata,
+            }
+
+        metadata, image_tensor = await loop.run_in_executor(
+            self._prep_pool, self._prepare_image, file_path, mime_type
+        )
+
+        embeddings, category = await self._submit(image_tensor)
+
+        self._result_cache[file_hash] = (embeddings, category, metadata)
+        while len(self._result_cache) > MEDIA_RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+
         return {
             "embeddings": embeddings,
             "category": category,
             "metadata": metadata,
         }
+
+    async def _submit(self, image_tensor: torch.Tensor):
+        """Queue a preprocessed tensor for the micro-batcher; resolves to
+        (embeddings, category).
+
+        This is the hand-off between pipeline stages: decode/preprocess
+        (prep pool) feed this queue while the model worker (infer pool)
+        drains it, so disk, CPU and device work on different inputs at
+        once. The queue is bounded so a decode burst holds a few batches
+        of tensors at most; past that, producers block here instead of
+        accumulating preprocessed images in memory.
+        """
+        if self._batch_queue is None:
+            self._batch_queue = asyncio.Queue(maxsize=4 * RESNET_BATCH_MAX)
+            self._batch_worker = asyncio.get_running_loop().create_task(
+                self._batch_loop()
+            )
+        future = asyncio.get_running_loop().create_future()
+        await self._batch_queue.put((image_tensor, future))
+        return await future
+
+    async def _batch_loop(self):
+        """Coalesce queued tensors into batched forwards and fan per-input
+        results back to the awaiting futures"""
+        loop = asyncio.get_running_loop()
+        while True:
+            tensor, future = await self._batch_queue.get()
+            batch = [(tensor, future)]
+            deadline = loop.time() + RESNET_BATCH_WAIT
+            while len(batch) < RESNET_BATCH_MAX:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._batch_queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            stacked = torch.cat([t for t, _ in batch], dim=0)
+            try:
+                results = await loop.run_in_executor(
+                    self._infer_pool, self._embed_and_classify, stacked
+                )
+                for (_, fut), result in zip(batch, results):
+                    if not fut.done():
+                        fut.set_result(result)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def _embed_and_classify(self, batch_tensor: torch.Tensor):
+        """Single forward pass over a batch: the dual-head classifier
+        returns pooled features and logits together. Returns one
+        (embeddings, category) pair per input row"""
+        batch_tensor = batch_tensor.to(memory_format=torch.channels_last)
+        with torch.no_grad():
+            # The TensorRT engine is built for batch 1; larger batches take
+            # the eager model
+            if self._int8_model is not None:
+                features, outputs = self._int8_model(batch_tensor)
+            elif self._trt_model is not None and batch_tensor.shape[0] == 1:
+                features, outputs = self._trt_model(batch_tensor)
+            elif self.device == "cuda":
+                # fp16 autocast: Tensor-Core convs, half the activation
+                # bandwidth; argmax is rank-stable in half precision
+                with torch.autocast(device_type="cuda", dtype=torch.float16):
+                    features, outputs = self.classifier(batch_tensor)
+            else:
+                features, outputs = self.classifier(batch_tensor)
+                if self._int8_prepared is not None:
+                    # Feed the observers real activations; convert once
+                    # enough batches have been seen
+                    self._int8_prepared(batch_tensor)
+                    self._int8_calib_left -= 1
+                    if self._int8_calib_left <= 0:
+                        try:
+                            from torch.ao.quantization.quantize_fx import convert_fx
+                            self._int8_model = convert_fx(self._int8_prepared)
+                            logger.info("ResNet50 converted to INT8")
+                        except Exception as e:
+                            logger.warning(f"INT8 conversion failed: {e}")
+                        self._int8_prepared = None
+            # softmax is monotonic, so argmax over raw logits picks the
+            # same class without exponentiating 1000 values per image
+            idx = torch.argmax(outputs, dim=1)
+            # fp16 halves every downstream cost of the vectors - index
+            # rows, response payloads, ANN memory bandwidth - and ResNet
+            # features are well within half-precision range
+            feats = features.half()
+            if self.device == "cuda":
+                # Queue both D2H copies into pinned host buffers and sync
+                # the stream once for the whole batch, instead of paying
+                # an implicit per-tensor sync for indices and features
+                idx_cpu = torch.empty(
+                    idx.shape, dtype=idx.dtype, pin_memory=True
+                )
+                feats_cpu = torch.empty(
+                    feats.shape, dtype=feats.dtype, pin_memory=True
+                )
+                idx_cpu.copy_(idx, non_blocking=True)
+                feats_cpu.copy_(feats, non_blocking=True)
+                torch.cuda.current_stream().synchronize()
+            else:
+                idx_cpu, feats_cpu = idx, feats
+            top_indices = idx_cpu.tolist()
+            flat = feats_cpu.numpy().reshape(len(top_indices), -1)
+        results = []
+        for row, top_idx in enumerate(top_indices):
+            category = self._map_to_category(self.imagenet_labels[top_idx])
+            # Each row is a view into the batch's single output array — one
+            # allocation per batch, not per image, and no boxed floats. The
+            # array must stay immutable after return: the memo cache and
+            # response serializer hold these rows beyond this call, which
+            # is also why a recycled slot pool isn't safe here
+            results.append((flat[row], category))
+        return results
     
     async def _process_video(self, file_path: Path, mime_type: str) -> Dict:
-        """Process video file by extracting frames and analyzing them"""
+        """Process video file by sampling frames and analyzing them in one
+        batched forward"""
         logger.info(f"Video processing for {file_path}")
         loop = asyncio.get_event_loop()
-        
-        def extract_video_frame():
-            """Extract a frame from video for analysis"""
+
+        def extract_video_frames():
+            """Extract up to VIDEO_SAMPLE_FRAMES uniformly spaced frames"""
             try:
+                # Fastest path: PyAV with keyframe-only decoding. The
+                # decoder only touches keyframes, so a sequential pass
+                # collects them cheaply; we then thin them out to the
+                # sample budget
+                try:
+                    import av
+                    with av.open(str(file_path)) as container:
+                        stream = container.streams.video[0]
+                        num_frames = stream.frames or 0
+                        stream.codec_context.skip_frame = "NONKEY"
+                        frames = []
+                        if stream.duration:
+                            # Seek to uniformly spaced timestamps and take
+                            # the first keyframe at each, so memory stays
+                            # at the sample budget no matter how long the
+                            # video is; pts dedup covers short clips where
+                            # neighbouring seeks land on the same keyframe
+                            seen_pts = set()
+                            for i in range(VIDEO_SAMPLE_FRAMES):
+                                container.seek(
+                                    stream.duration * i // VIDEO_SAMPLE_FRAMES,
+                                    stream=stream,
+                                )
+                                for frame in container.decode(stream):
+                                    if frame.pts not in seen_pts:
+                                        seen_pts.add(frame.pts)
+                                        frames.append(
+                                            Image.fromarray(
+                                                frame.to_ndarray(format="rgb24")
+                                            )
+                                        )
+                                    break
+                        else:
+                            # No duration in the header: take the first
+                            # keyframes up to the budget
+                            for frame in container.decode(stream):
+                                frames.append(
+                                    Image.fromarray(
+                                        frame.to_ndarray(format="rgb24")
+                                    )
+                                )
+                                if len(frames) >= VIDEO_SAMPLE_FRAMES:
+                                    break
+                        if frames:
+                            return frames, num_frames
+                except ImportError:
+                    pass
+                except Exception as e:
+                    logger.warning(f"PyAV frame extraction failed: {e}")
+
                 # Try using imageio-ffmpeg or opencv
                 try:
                     import imageio
                     import imageio_ffmpeg
                     reader = imageio.get_reader(file_path)
-                    # Get frame from middle of video
                     num_frames = reader.count_frames()
                     if num_frames > 0:
-                        frame_idx = num_frames // 2
-                        frame = reader.get_data(frame_idx)
+                        count = min(VIDEO_SAMPLE_FRAMES, num_frames)
+                        indices = [
+                            (i * num_frames) // count for i in range(count)
+                        ]
+                        frames = [
+                            Image.fromarray(reader.get_data(idx))
+                            for idx in indices
+                        ]
                         reader.close()
-                        # Convert numpy array to PIL Image
-                        frame_image = Image.fromarray(frame)
-                        return frame_image, num_frames
+                        return frames, num_frames
                 except ImportError:
                     pass
-                
+
                 # Fallback: try opencv
                 try:
                     import cv2
                     cap = cv2.VideoCapture(str(file_path))
                     if not cap.isOpened():
                         raise ValueError("Could not open video file")
-                    
-                    # Get video properties
+
                     num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                    fps = cap.get(cv2.CAP_PROP_FPS)
-                    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    
-                    # Extract frame from middle
+                    frames = []
                     if num_frames > 0:
-                        frame_idx = num_frames // 2
-                        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                        ret, frame = cap.read()
-                        cap.release()
-                        
-                        if ret:
-                            # Convert BGR to RGB
-                            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                            frame_image = Image.fromarray(frame_rgb)
-                            return frame_image, num_frames
+                        count = min(VIDEO_SAMPLE_FRAMES, num_frames)
+                        for i in range(count):
+                            cap.set(
+                                cv2.CAP_PROP_POS_FRAMES,
+                                (i * num_frames) // count,
+                            )
+                            ret, frame = cap.read()
+                            if ret:
+                                frames.append(
+                                    Image.fromarray(
+                                        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                                    )
+                                )
+                    cap.release()
+                    if frames:
+                        return frames, num_frames
                 except ImportError:
                     pass
-                
+
                 # If no video library available
-                return None, 0
+                return [], 0
             except Exception as e:
-                logger.warning(f"Error extracting video frame: {e}")
-                return None, 0
-        
-        frame_image, num_frames = await loop.run_in_executor(None, extract_video_frame)
-        
+                logger.warning(f"Error extracting video frames: {e}")
+                return [], 0
+
+        frames, num_frames = await loop.run_in_executor(None, extract_video_frames)
+
         metadata = {
             "mime_type": mime_type,
             "type": "video",
             "num_frames": num_frames,
             "file_size": file_path.stat().st_size,
         }
-        
-        # If we successfully extracted a frame, process it like an image
-        if frame_image:
+
+        # If we successfully extracted frames, run them as one batch
+        if frames:
             try:
-                # Get frame dimensions
-                metadata["width"] = frame_image.width
-                metadata["height"] = frame_image.height
-                
-                # Preprocess frame for ResNet
-                image_tensor = self.image_transform(frame_image).unsqueeze(0).to(self.device)
-                
-                # Generate embeddings from frame
-                with torch.no_grad():
-                    features = self.embedding_model(image_tensor)
-                    embeddings = features.cpu().numpy().flatten().tolist()
-                
-                # Predict category using ResNet classifier
-                def predict_category():
-                    with torch.no_grad():
-                        outputs = self.classifier(image_tensor)
-                        probs = torch.nn.functional.softmax(outputs, dim=1)
-                        top_idx = torch.argmax(probs, dim=1).item()
-                        imagenet_label = self.imagenet_labels[top_idx]
-                        # Map to meaningful category
-                        return self._map_to_category(imagenet_label)
-                
-                category = await loop.run_in_executor(None, predict_category)
-                
+                metadata["width"] = frames[0].width
+                metadata["height"] = frames[0].height
+                metadata["sampled_frames"] = len(frames)
+
+                # Preprocess all frames into one stacked batch, off the
+                # event loop
+                batch_tensor = await loop.run_in_executor(
+                    self._prep_pool,
+                    lambda: self._to_device(
+                        torch.stack(
+                            [self.image_transform(f) for f in frames]
+                        )
+                    ),
+                )
+
+                # One forward for the whole clip instead of a pass per
+                # frame; skip the micro-batcher since this already is a
+                # full batch
+                results = await loop.run_in_executor(
+                    self._infer_pool, self._embed_and_classify, batch_tensor
+                )
+
+                # Average frame features into one clip embedding; the clip
+                # category is the majority top-1 across frames
+                embeddings = np.mean(
+                    np.stack([emb for emb, _ in results]), axis=0
+                )
+                category = Counter(
+                    cat for _, cat in results
+                ).most_common(1)[0][0]
+
                 return {
                     "embeddings": embeddings,
                     "category": category,
                     "metadata": metadata,
                 }
             except Exception as e:
-                logger.error(f"Error processing video frame: {e}")
+                logger.error(f"Error processing video frames: {e}")
                 return {
                     "embeddings": None,
                     "category": "uncategorized",
                     "metadata": {**metadata, "error": str(e)},
                 }
         else:
-            # No frame extracted - try to categorize from filename
-            logger.warning(f"Could not extract frame from video {file_path}")
+            # No frames extracted - try to categorize from filename
+            logger.warning(f"Could not extract frames from video {file_path}")
             category = self._categorize_from_filename(file_path)
             return {
                 "embeddings": None,
@@ -304,3 +814,7 @@ class MediaProcessor:
     def get_embeddings_dim(self) -> int:
         """Embedding dimension from ResNet output"""
         return 2048
+
+    def get_embeddings_dtype(self) -> str:
+        """Element dtype of the returned embedding vectors"""
+        return "float16"